@@ -0,0 +1,197 @@
+"""
+Benchmark degrees path search on synthetic data.
+
+Generates people.csv, movies.csv and stars.csv of a chosen size, then
+for each search configuration measures load time, query latency
+percentiles and peak memory in a fresh process, printing the results
+as JSON.
+
+Usage: python benchmark.py [--people N] [--movies N] [--strategies ...]
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+# Name -> (load in compact form, search strategy)
+CONFIGURATIONS = {
+    "dijkstra": (False, "dijkstra"),
+    "bidirectional": (False, "bidirectional"),
+    "compact": (True, "bidirectional"),
+    "alt": (True, "alt"),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python benchmark.py")
+    parser.add_argument("--people", type=int, default=20000)
+    parser.add_argument("--movies", type=int, default=10000)
+    parser.add_argument("--cast", type=int, default=4,
+                        help="average number of stars per movie")
+    parser.add_argument("--distribution", choices=("uniform", "zipf"),
+                        default="zipf",
+                        help="how often each person is cast")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--strategies", default=",".join(CONFIGURATIONS))
+    parser.add_argument("--directory",
+                        help="benchmark existing CSV files instead")
+    parser.add_argument("--output", help="write JSON results to a file")
+    args = parser.parse_args()
+
+    strategies = args.strategies.split(",")
+    for strategy in strategies:
+        if strategy not in CONFIGURATIONS:
+            sys.exit(f"Unknown strategy: {strategy}")
+
+    with tempfile.TemporaryDirectory() as scratch:
+        directory = args.directory
+        if directory is None:
+            directory = scratch
+            generate(directory, args.people, args.movies, args.cast,
+                     args.distribution, args.seed)
+        pairs = sample_pairs(directory, args.queries, args.seed)
+
+        if args.directory is None:
+            dataset = {
+                "people": args.people,
+                "movies": args.movies,
+                "cast": args.cast,
+                "distribution": args.distribution,
+                "seed": args.seed,
+            }
+        else:
+            dataset = {"directory": args.directory}
+        results = {"dataset": dataset, "queries": len(pairs), "results": {}}
+
+        # Each configuration runs in a new process so load time and
+        # peak memory are not affected by the ones before it
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(1, maxtasksperchild=1) as pool:
+            for strategy in strategies:
+                results["results"][strategy] = pool.apply(
+                    measure, (directory, strategy, pairs, scratch)
+                )
+
+    encoded = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(encoded + "\n")
+    else:
+        print(encoded)
+
+
+def generate(directory, num_people, num_movies, cast, distribution, seed):
+    """
+    Writes a synthetic dataset. Cast sizes are drawn around `cast`, and
+    with the zipf distribution a few people star in many movies, as in
+    the real data.
+    """
+    rng = random.Random(seed)
+    if distribution == "zipf":
+        weights = [1 / (rank + 1) for rank in range(num_people)]
+    else:
+        weights = [1] * num_people
+    cumulative = []
+    total = 0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for person in range(num_people):
+            writer.writerow([person + 1, f"Person {person + 1}",
+                             rng.randint(1920, 2010)])
+
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for movie in range(num_movies):
+            writer.writerow([movie + 1, f"Movie {movie + 1}",
+                             rng.randint(1930, 2020)])
+
+    with open(os.path.join(directory, "stars.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(num_movies):
+            size = max(1, min(num_people, round(rng.expovariate(1 / cast))))
+            stars = set(rng.choices(range(num_people), cum_weights=cumulative,
+                                    k=size))
+            for person in sorted(stars):
+                writer.writerow([person + 1, movie + 1])
+
+
+def sample_pairs(directory, count, seed):
+    """
+    Returns `count` random (source, target) pairs of people who star
+    in at least one movie.
+    """
+    with open(os.path.join(directory, "stars.csv"), encoding="utf-8") as f:
+        person_ids = sorted({row["person_id"] for row in csv.DictReader(f)})
+    rng = random.Random(seed)
+    return [(rng.choice(person_ids), rng.choice(person_ids))
+            for _ in range(count)]
+
+
+def measure(directory, strategy, pairs, scratch):
+    """
+    Loads the data and answers every pair with one configuration.
+    Runs in a fresh worker process.
+    """
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import degrees
+
+    compact, search = CONFIGURATIONS[strategy]
+    start = time.perf_counter()
+    degrees.load_data(directory, compact=compact)
+    if search == "alt":
+        degrees.load_landmarks(os.path.join(scratch, "landmarks"))
+    load_seconds = time.perf_counter() - start
+
+    latencies = []
+    connected = 0
+    for source, target in pairs:
+        start = time.perf_counter()
+        path = degrees.shortest_path(source, target, search)
+        latencies.append(time.perf_counter() - start)
+        connected += path is not None
+    latencies.sort()
+
+    return {
+        "load_seconds": load_seconds,
+        "connected": connected,
+        "latency_ms": {
+            "mean": 1000 * sum(latencies) / len(latencies) if latencies else None,
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": 1000 * latencies[-1] if latencies else None,
+        },
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def percentile(values, p):
+    """
+    Returns the p-th percentile of sorted seconds, in milliseconds.
+    """
+    if not values:
+        return None
+    i = min(len(values) - 1, round(p / 100 * (len(values) - 1)))
+    return 1000 * values[i]
+
+
+if __name__ == "__main__":
+    main()
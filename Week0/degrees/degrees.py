@@ -1,8 +1,18 @@
-import csv
-import sys
+import argparse
+import functools
 import heapq
+import itertools
+import json
+import multiprocessing
+import struct
+import sys
 
 from util import Node, StackFrontier, QueueFrontier
+from graph import (Graph, component_report, component_sizes,
+                   fingerprint_csv, join_paths, label_components, load_cached,
+                   new_load_stats, read_rows, starring_people)
+from landmarks import LandmarkIndex
+from nameindex import NameIndex
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -13,55 +23,219 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Maps person_ids to the label of their connected component
+components = {}
+
+# Compact integer-indexed graph, used instead of the dicts above
+# when data is loaded with compact=True
+graph = None
+
+# Landmark distance index over the compact graph, if one was loaded
+landmarks = None
+
+# Prefix and fuzzy name lookup, built on first use
+name_index = None
 
-def load_data(directory):
+# Directory the data was loaded from
+data_directory = None
+
+
+def load_data(directory, compact=False, cache=None, movie_filter=None):
     """
     Load data from CSV files into memory.
+
+    With a cache path the compact graph is memory-mapped from that
+    snapshot, which is rebuilt whenever the CSV files change.
+
+    movie_filter, if given, is called with (id, title, year) for each
+    movie, and only accepted movies and their stars are loaded.
+
+    Returns a dictionary counting the rows kept and dropped, or None
+    when the data came from a snapshot.
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
+    global graph, landmarks, name_index, data_directory
+    name_index = None
+    landmarks = None
+    data_directory = directory
+    if cache is not None:
+        if movie_filter is not None:
+            raise ValueError("a movie filter cannot be used with a cache")
+        graph = load_cached(directory, cache)
+        return None
+    if compact:
+        graph = Graph.from_csv(directory, movie_filter)
+        return graph.load_stats
+
+    # Forget anything loaded before, so queries use these dicts
+    graph = None
+    names.clear()
+    people.clear()
+    movies.clear()
+
+    stats = new_load_stats()
 
     # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
+    skipped_movies = set()
+    for movie_id, title, year in read_rows(f"{directory}/movies.csv",
+                                           "id", "title", "year"):
+        if movie_filter is not None and not movie_filter(movie_id, title, year):
+            skipped_movies.add(movie_id)
+            continue
+        movies[movie_id] = {
+            "title": title,
+            "year": year,
+            "stars": set()
+        }
+    stats["movies"] = len(movies)
+    stats["filtered_movies"] = len(skipped_movies)
+
+    # Load people, only those in accepted movies when filtering
+    wanted = None
+    if movie_filter is not None:
+        wanted = starring_people(directory, movies)
+    for person_id, name, birth in read_rows(f"{directory}/people.csv",
+                                            "id", "name", "birth"):
+        if wanted is not None and person_id not in wanted:
+            stats["filtered_people"] += 1
+            continue
+        people[person_id] = {
+            "name": name,
+            "birth": birth,
+            "movies": set()
+        }
+        if name.lower() not in names:
+            names[name.lower()] = {person_id}
+        else:
+            names[name.lower()].add(person_id)
+    stats["people"] = len(people)
 
     # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    for person_id, movie_id in read_rows(f"{directory}/stars.csv",
+                                         "person_id", "movie_id"):
+        if movie_id not in movies:
+            if movie_id in skipped_movies:
+                stats["filtered_edges"] += 1
+            else:
+                stats["dangling_movie_edges"] += 1
+        elif person_id not in people:
+            stats["dangling_person_edges"] += 1
+        elif movie_id in people[person_id]["movies"]:
+            stats["duplicate_edges"] += 1
+        else:
+            people[person_id]["movies"].add(movie_id)
+            movies[movie_id]["stars"].add(person_id)
+            stats["edges"] += 1
+
+    # Label connected components, so unconnected pairs need no search
+    person_ids = list(people)
+    index = {person_id: i for i, person_id in enumerate(person_ids)}
+    labels = label_components(len(person_ids), (
+        [index[person_id] for person_id in movie["stars"]]
+        for movie in movies.values()
+    ))
+    components.clear()
+    components.update(zip(person_ids, labels))
+
+    return stats
+
+
+def load_landmarks(path, count=16):
+    """
+    Load the landmark index at path, building and saving it first if
+    it is missing or was built for different data. Needs the compact
+    graph to be loaded.
+    """
+    global landmarks
+    if graph is None:
+        raise ValueError("landmarks need data loaded with compact=True")
+    try:
+        index = LandmarkIndex.load(path)
+    except (OSError, ValueError, KeyError, struct.error):
+        index = None
+    stored = index.fingerprint if index is not None else None
+    if index is None or not index.matches(graph, data_directory):
+        index = LandmarkIndex.build(graph, count,
+                                    fingerprint_csv(data_directory))
+        index.save(path)
+    elif index.fingerprint != stored:
+        # Only modification times changed; record them so the CSV
+        # files are not hashed again next time
+        index.save(path)
+    landmarks = index
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(prog="python degrees.py")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--compact", action="store_true",
+                        help="load into the integer-indexed graph")
+    parser.add_argument("--cache", metavar="PATH",
+                        help="memory-map the compact graph from a snapshot")
+    parser.add_argument("--since", type=int, metavar="YEAR",
+                        help="only load movies released in or after YEAR")
+    parser.add_argument("--landmarks", metavar="PATH",
+                        help="load or build a landmark distance index")
+    parser.add_argument("--strategy", default="bidirectional",
+                        choices=("bidirectional", "dijkstra", "alt"),
+                        help="search strategy; alt needs --landmarks and "
+                             "dijkstra cannot use the compact graph")
+    parser.add_argument("--batch", action="store_true",
+                        help="answer tab-separated name pairs from stdin")
+    parser.add_argument("--reach", action="store_true",
+                        help="report distances from each name on stdin")
+    parser.add_argument("--fuzzy", action="store_true",
+                        help="resolve batch names by prefix or spelling")
+    parser.add_argument("--components", action="store_true",
+                        help="print connected component sizes and exit")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes used to answer batch queries")
+    args = parser.parse_args()
+
+    # Reject strategies the requested data layout cannot run before
+    # spending time loading
+    compact = args.compact or bool(args.cache) or bool(args.landmarks)
+    if args.strategy == "alt" and not args.landmarks:
+        parser.error("--strategy alt needs --landmarks")
+    if args.strategy == "dijkstra" and compact:
+        parser.error("--strategy dijkstra cannot be used with --compact, "
+                     "--cache or --landmarks")
+    if args.since is not None and args.cache:
+        parser.error("--since cannot be used with --cache")
 
     # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    log = sys.stderr if args.batch or args.reach else sys.stdout
+    print("Loading data...", file=log)
+    movie_filter = None
+    if args.since is not None:
+        def movie_filter(movie_id, title, year):
+            return year.isdigit() and int(year) >= args.since
+    stats = load_data(args.directory,
+                      compact=args.compact or bool(args.landmarks),
+                      cache=args.cache, movie_filter=movie_filter)
+    if stats is not None:
+        dropped = (stats["dangling_person_edges"]
+                   + stats["dangling_movie_edges"])
+        if dropped:
+            print(f"Dropped {dropped} stars rows with unknown ids.", file=log)
+    if args.landmarks:
+        load_landmarks(args.landmarks)
+    if args.fuzzy:
+        get_name_index()
+    print("Data loaded.", file=log)
+
+    if args.components:
+        print(json.dumps(components_report()))
+        return
+
+    if args.batch:
+        answer = functools.partial(answer_query, strategy=args.strategy,
+                                   fuzzy=args.fuzzy)
+        run_batch(sys.stdin, sys.stdout, answer, workers=args.workers)
+        return
+    if args.reach:
+        answer = functools.partial(answer_reach, fuzzy=args.fuzzy)
+        run_batch(sys.stdin, sys.stdout, answer, workers=args.workers)
+        return
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -70,7 +244,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, args.strategy)
     
     if path is None:
         print("Not connected.")
@@ -79,14 +253,292 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = person_info(path[i][1])["name"]
+            person2 = person_info(path[i + 1][1])["name"]
+            movie = movie_info(path[i + 1][0])["title"]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
-    
+def run_batch(lines, output, answer, workers=1):
+    """
+    Answers one query per non-blank input line, writing whatever
+    `answer` returns for it as one output line, in the same order.
+    """
+    queries = (line for line in lines if line.strip())
+    answer = functools.partial(answer_safely, answer)
+    for result in parallel_map(answer, queries, workers):
+        print(result, file=output, flush=True)
+
+
+def answer_safely(answer, line):
+    """
+    Calls answer on a query line, turning any exception into an error
+    line so one bad query does not stop the batch.
+    """
+    try:
+        return answer(line)
+    except Exception as e:
+        return json.dumps({"query": line.rstrip("\n"),
+                           "error": f"{type(e).__name__}: {e}"})
+
+
+def parallel_map(function, items, workers=1):
+    """
+    Lazily maps function over items, preserving order.
+
+    With several workers the items are spread over a pool of forked
+    processes, which share the already loaded data copy-on-write.
+    Items are sent one at a time, so a result is ready as soon as it
+    is computed even while the input is still open.
+    """
+    if workers <= 1:
+        yield from map(function, items)
+        return
+
+    context = multiprocessing.get_context("fork")
+    with context.Pool(workers) as pool:
+        yield from pool.imap(function, items)
+
+
+def answer_query(line, strategy="bidirectional", fuzzy=False):
+    """
+    Returns the JSON-encoded answer to a single batch query line.
+    """
+    fields = line.rstrip("\n").split("\t")
+    if len(fields) != 2:
+        return json.dumps({"query": line.rstrip("\n"),
+                           "error": "expected source<TAB>target"})
+
+    answer = {"source": fields[0], "target": fields[1]}
+    person_ids = []
+    for field in fields:
+        person_id, error = resolve_person(field, fuzzy)
+        if error is not None:
+            answer["error"] = error
+            return json.dumps(answer)
+        person_ids.append(person_id)
+    if fuzzy:
+        answer["matched"] = [person_info(p)["name"] for p in person_ids]
+
+    if landmarks is not None:
+        answer["bounds"] = separation_bounds(*person_ids)
+    path = shortest_path(*person_ids, strategy)
+    if path is None:
+        answer["degrees"] = None
+        answer["path"] = None
+    else:
+        answer["degrees"] = len(path)
+        answer["path"] = [list(step) for step in path]
+    return json.dumps(answer)
+
+
+def answer_reach(line, fuzzy=False):
+    """
+    Returns the JSON-encoded reach report for a single name or id.
+    """
+    name = line.strip()
+    person_id, error = resolve_person(name, fuzzy)
+    if error is not None:
+        return json.dumps({"source": name, "error": error})
+    report = reach_report(person_id)
+    report["source"] = name
+    return json.dumps(report)
+
+
+def reach_report(person_id):
+    """
+    Runs one breadth-first search from a person and returns a
+    dictionary with:
+        "histogram": number of people exactly k degrees away, for each k
+        "within": number of people at most k degrees away, for each k
+        "eccentricity": degrees to the farthest reachable people
+        "farthest": sorted person_ids of those farthest people
+    """
+    histogram = []
+    for layer in distance_layers(person_id):
+        histogram.append(len(layer))
+
+    within = list(itertools.accumulate(histogram))
+    return {
+        "histogram": histogram,
+        "within": within,
+        "eccentricity": len(histogram) - 1,
+        "farthest": sorted(layer),
+    }
+
+
+def reach_reports(person_ids, workers=1):
+    """
+    Returns reach_report for each person, computed in parallel
+    across worker processes when workers > 1.
+    """
+    return list(parallel_map(reach_report, person_ids, workers))
+
+
+def distance_layers(person_id):
+    """
+    Yields lists of the person_ids exactly 0, 1, 2, ... degrees away
+    from a person, until everyone reachable has been visited.
+    """
+    if graph is not None:
+        source = graph.index_of_person(person_id)
+        visited = bytearray(graph.num_people)
+        visited[source] = 1
+        frontier = [source]
+        while frontier:
+            yield [graph.person_ids[person] for person in frontier]
+            next_frontier = []
+            for person in frontier:
+                for movie in graph.movies_of(person):
+                    for neighbor in graph.stars_of(movie):
+                        if not visited[neighbor]:
+                            visited[neighbor] = 1
+                            next_frontier.append(neighbor)
+            frontier = next_frontier
+        return
+
+    visited = {person_id}
+    frontier = [person_id]
+    while frontier:
+        yield frontier
+        next_frontier = []
+        for person in frontier:
+            for movie_id in people[person]["movies"]:
+                for neighbor in movies[movie_id]["stars"]:
+                    if neighbor not in visited:
+                        visited.add(neighbor)
+                        next_frontier.append(neighbor)
+        frontier = next_frontier
+
+
+def separation_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between
+    two people from the landmark index, without searching. Both are
+    None when the people are known not to be connected.
+    """
+    if landmarks is None:
+        raise ValueError("separation bounds need a landmark index")
+    return landmarks.bounds(graph.index_of_person(source),
+                            graph.index_of_person(target))
+
+
+def resolve_person(name, fuzzy=False):
+    """
+    Non-interactive version of person_id_for_name. The name may also
+    be an IMDB person id. Returns (person_id, error).
+
+    With fuzzy set, names that are ambiguous, misspelled or only a
+    prefix resolve to the best match with the most movies.
+    """
+    if person_exists(name):
+        return name, None
+    if fuzzy:
+        person_id, _ = get_name_index().resolve(name)
+        if person_id is None:
+            return None, f"person not found: {name}"
+        return person_id, None
+    if graph is not None:
+        person_ids = [graph.person_ids[p] for p in graph.people_named(name)]
+    else:
+        person_ids = list(names.get(name.lower(), set()))
+    if len(person_ids) == 0:
+        return None, f"person not found: {name}"
+    if len(person_ids) > 1:
+        return None, f"ambiguous name: {name} ({', '.join(sorted(person_ids))})"
+    return person_ids[0], None
+
+
+def shortest_path(source, target, strategy="bidirectional"):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target.
+
+    If no possible path, returns None.
+    """
+    if not same_component(source, target):
+        return None
+
+    if graph is not None:
+        source, target = (graph.index_of_person(source),
+                          graph.index_of_person(target))
+        if strategy == "bidirectional":
+            path = graph.shortest_path(source, target)
+        elif strategy == "alt":
+            if landmarks is None:
+                raise ValueError("strategy alt needs a landmark index")
+            path = landmarks.shortest_path(graph, source, target)
+        else:
+            raise ValueError(f"strategy {strategy} needs data loaded as dicts")
+        if path is None:
+            return None
+        return [(graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in path]
+
+    try:
+        search = STRATEGIES[strategy]
+    except KeyError:
+        raise ValueError(f"unknown search strategy: {strategy}")
+    return search(source, target)
+
+
+def bidirectional_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, using a breadth-first
+    search that grows from both ends and always expands the
+    smaller frontier.
+
+    Only people actually reached are stored, so a query costs
+    time proportional to the part of the graph it explores.
+
+    If no possible path, returns None.
+    """
+    if source == target:
+        return []
+
+    # Maps each reached person to (movie_id, person_id) of the step
+    # towards the source (forward) or towards the target (backward)
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+
+        # Expand one whole layer on the cheaper side
+        if len(forward_frontier) <= len(backward_frontier):
+            frontier, parents, others = forward_frontier, forward, backward
+        else:
+            frontier, parents, others = backward_frontier, backward, forward
+
+        next_frontier = []
+        for person_id in frontier:
+            for movie_id in people[person_id]["movies"]:
+                for neighbor in movies[movie_id]["stars"]:
+                    if neighbor in parents:
+                        continue
+                    parents[neighbor] = (movie_id, person_id)
+                    if neighbor in others:
+                        return join_paths(forward, backward, neighbor)
+                    next_frontier.append(neighbor)
+
+        if parents is forward:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    return None
+
+
+def dijkstra_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, using Dijkstra's
+    algorithm over every person in the dataset.
+
+    If no possible path, returns None.
+    """
     distances = { node:float('inf') for node in people.keys() }
     distances[source] = 0
     previous = { node:None for node in people.keys() }
@@ -134,13 +586,16 @@ def person_id_for_name(name):
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    if graph is not None:
+        person_ids = [graph.person_ids[p] for p in graph.people_named(name)]
+    else:
+        person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
+            person = person_info(person_id)
             name = person["name"]
             birth = person["birth"]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
@@ -160,6 +615,11 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return {(graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in graph.neighbors(
+                    graph.index_of_person(person_id))}
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -168,6 +628,88 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+def get_name_index():
+    """
+    Returns the name index for the loaded data, building it once.
+    """
+    global name_index
+    if name_index is None:
+        if graph is not None:
+            offsets = graph.person_offsets
+            entries = (
+                (graph.person_ids[p], graph.person_names[p],
+                 offsets[p + 1] - offsets[p])
+                for p in range(graph.num_people)
+            )
+        else:
+            entries = (
+                (person_id, person["name"], len(person["movies"]))
+                for person_id, person in people.items()
+            )
+        name_index = NameIndex(entries)
+    return name_index
+
+
+def same_component(source, target):
+    """
+    Returns False if two people are known to be in different
+    connected components.
+    """
+    if graph is not None:
+        return (graph.components[graph.index_of_person(source)]
+                == graph.components[graph.index_of_person(target)])
+    if source in components and target in components:
+        return components[source] == components[target]
+    return True
+
+
+def components_report(top=10):
+    """
+    Returns the number of connected components, the sizes of the
+    largest ones and how many people are isolated.
+    """
+    if graph is not None:
+        return graph.component_report(top)
+    return component_report(component_sizes(components.values()), top)
+
+
+def person_exists(person_id):
+    """
+    Returns True if a person with this IMDB id was loaded.
+    """
+    if graph is not None:
+        return graph.index_of_person(person_id) is not None
+    return person_id in people
+
+
+def person_info(person_id):
+    """
+    Returns a dictionary with the name and birth of a person.
+    """
+    if graph is not None:
+        p = graph.index_of_person(person_id)
+        return {"name": graph.person_names[p],
+                "birth": graph.person_births[p]}
+    return people[person_id]
+
+
+def movie_info(movie_id):
+    """
+    Returns a dictionary with the title and year of a movie.
+    """
+    if graph is not None:
+        m = graph.index_of_movie(movie_id)
+        return {"title": graph.movie_titles[m],
+                "year": graph.movie_years[m]}
+    return movies[movie_id]
+
+
+STRATEGIES = {
+    "bidirectional": bidirectional_path,
+    "dijkstra": dijkstra_path,
+}
+
+
 if __name__ == "__main__":
     main()
     
@@ -0,0 +1,686 @@
+"""
+Compact co-star network for degrees.
+
+People and movies are interned to dense integers and the bipartite
+person <-> movie relation is stored twice in compressed-sparse-row
+form: for person p, its movies are
+
+    person_movies[person_offsets[p]:person_offsets[p + 1]]
+
+and symmetrically for the stars of a movie. Everything lives in flat
+`array` buffers, so an edge costs 8 bytes instead of a pair of
+entries in Python sets.
+"""
+
+import csv
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Binary snapshot layout: magic, format version, header length, then a
+# JSON header describing the CSV fingerprint and where each array lives
+SNAPSHOT_MAGIC = b"DEGREES\0"
+SNAPSHOT_VERSION = 2
+CSV_FILES = ("people.csv", "movies.csv", "stars.csv")
+
+
+class StringTable():
+    """
+    Immutable sequence of strings packed into one UTF-8 buffer.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        data = bytearray()
+        offsets = array("q", [0])
+        for string in strings:
+            data += string.encode("utf-8")
+            offsets.append(len(data))
+        return cls(bytes(data), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class Graph():
+    """
+    Integer-indexed bipartite graph of people and the movies they
+    starred in.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies,
+                 movie_offsets, movie_stars,
+                 id_order=None, name_order=None, movie_order=None,
+                 components=None):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+
+        # Permutations of indexes sorted by id and by lowercase name,
+        # so lookups are a binary search instead of a dict
+        if id_order is None:
+            id_order = array("i", sorted(
+                range(len(person_ids)), key=lambda p: person_ids[p]
+            ))
+        if name_order is None:
+            name_order = array("i", sorted(
+                range(len(person_names)),
+                key=lambda p: person_names[p].lower()
+            ))
+        if movie_order is None:
+            movie_order = array("i", sorted(
+                range(len(movie_ids)), key=lambda m: movie_ids[m]
+            ))
+        self.id_order = id_order
+        self.name_order = name_order
+        self.movie_order = movie_order
+
+        # Connected component label of every person, largest first
+        if components is None:
+            components = label_components(
+                len(person_offsets) - 1,
+                (movie_stars[movie_offsets[m]:movie_offsets[m + 1]]
+                 for m in range(len(movie_offsets) - 1))
+            )
+        self.components = components
+        self.component_sizes = None
+        self.load_stats = None
+
+    @classmethod
+    def from_csv(cls, directory, movie_filter=None):
+        """
+        Load people.csv, movies.csv and stars.csv from a directory.
+
+        movie_filter, if given, is called with (id, title, year) for
+        each movie and only movies it accepts are loaded, along with
+        the people who starred in them. Counts of dropped rows end up
+        in the graph's `load_stats`.
+        """
+        stats = new_load_stats()
+
+        movie_index = {}
+        movie_ids, movie_titles, movie_years = [], [], []
+        skipped_movies = set()
+        for row in read_rows(f"{directory}/movies.csv", "id", "title", "year"):
+            if row[0] in movie_index:
+                continue
+            if movie_filter is not None and not movie_filter(*row):
+                skipped_movies.add(row[0])
+                continue
+            movie_index[row[0]] = len(movie_ids)
+            movie_ids.append(row[0])
+            movie_titles.append(row[1])
+            movie_years.append(row[2])
+        stats["movies"] = len(movie_ids)
+        stats["filtered_movies"] = len(skipped_movies)
+
+        wanted = None
+        if movie_filter is not None:
+            wanted = starring_people(directory, movie_index)
+
+        person_index = {}
+        person_ids, person_names, person_births = [], [], []
+        for row in read_rows(f"{directory}/people.csv", "id", "name", "birth"):
+            if row[0] in person_index:
+                continue
+            if wanted is not None and row[0] not in wanted:
+                stats["filtered_people"] += 1
+                continue
+            person_index[row[0]] = len(person_ids)
+            person_ids.append(row[0])
+            person_names.append(row[1])
+            person_births.append(row[2])
+        stats["people"] = len(person_ids)
+
+        edge_people = array("i")
+        edge_movies = array("i")
+        for person_id, movie_id in read_rows(f"{directory}/stars.csv",
+                                             "person_id", "movie_id"):
+            m = movie_index.get(movie_id)
+            if m is None:
+                if movie_id in skipped_movies:
+                    stats["filtered_edges"] += 1
+                else:
+                    stats["dangling_movie_edges"] += 1
+                continue
+            p = person_index.get(person_id)
+            if p is None:
+                stats["dangling_person_edges"] += 1
+                continue
+            edge_people.append(p)
+            edge_movies.append(m)
+
+        graph = cls.from_edges(
+            StringTable.from_strings(person_ids),
+            StringTable.from_strings(person_names),
+            StringTable.from_strings(person_births),
+            StringTable.from_strings(movie_ids),
+            StringTable.from_strings(movie_titles),
+            StringTable.from_strings(movie_years),
+            edge_people, edge_movies
+        )
+        stats["edges"] = len(graph.person_movies)
+        stats["duplicate_edges"] = len(edge_people) - stats["edges"]
+        graph.load_stats = stats
+        return graph
+
+    @classmethod
+    def from_edges(cls, person_ids, person_names, person_births,
+                   movie_ids, movie_titles, movie_years,
+                   edge_people, edge_movies):
+        """
+        Build the graph from parallel arrays of (person, movie) edges.
+        Duplicate edges are dropped.
+        """
+        person_offsets, person_movies = _group(
+            edge_people, edge_movies, len(person_ids)
+        )
+
+        # Deduplicate each person's movies in place
+        write = 0
+        start = 0
+        for p in range(len(person_ids)):
+            end = person_offsets[p + 1]
+            person_offsets[p] = write
+            for m in sorted(set(person_movies[start:end])):
+                person_movies[write] = m
+                write += 1
+            start = end
+        person_offsets[len(person_ids)] = write
+        del person_movies[write:]
+
+        # The movie side is the transpose of the deduplicated person side
+        edge_people = array("i", bytes(4 * len(person_movies)))
+        for p in range(len(person_ids)):
+            for k in range(person_offsets[p], person_offsets[p + 1]):
+                edge_people[k] = p
+        movie_offsets, movie_stars = _group(
+            person_movies, edge_people, len(movie_ids)
+        )
+
+        return cls(person_ids, person_names, person_births,
+                   movie_ids, movie_titles, movie_years,
+                   person_offsets, person_movies,
+                   movie_offsets, movie_stars)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-map a snapshot written by `save`. Arrays are views into
+        the mapping, so nothing is parsed or copied up front.
+        Returns (graph, header).
+        """
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header, start = _read_header(mapping)
+        buffer = memoryview(mapping)
+
+        sections = {}
+        for name, (typecode, offset, length) in header["sections"].items():
+            if start + offset + length > len(mapping):
+                raise ValueError("snapshot is truncated")
+            section = buffer[start + offset:start + offset + length]
+            sections[name] = section if typecode == "B" else section.cast(typecode)
+
+        def strings(name):
+            return StringTable(sections[name + ".data"],
+                               sections[name + ".offsets"])
+
+        graph = cls(strings("person_ids"), strings("person_names"),
+                    strings("person_births"), strings("movie_ids"),
+                    strings("movie_titles"), strings("movie_years"),
+                    sections["person_offsets"], sections["person_movies"],
+                    sections["movie_offsets"], sections["movie_stars"],
+                    id_order=sections["id_order"],
+                    name_order=sections["name_order"],
+                    movie_order=sections["movie_order"],
+                    components=sections["components"])
+        graph.mapping = mapping
+        return graph, header
+
+    def save(self, path, fingerprint=None):
+        """
+        Write the graph to a binary snapshot that `load` can map back
+        into memory. The file is replaced atomically.
+        """
+        arrays = {
+            "person_offsets": self.person_offsets,
+            "person_movies": self.person_movies,
+            "movie_offsets": self.movie_offsets,
+            "movie_stars": self.movie_stars,
+            "id_order": self.id_order,
+            "name_order": self.name_order,
+            "movie_order": self.movie_order,
+            "components": self.components,
+        }
+        for name in ("person_ids", "person_names", "person_births",
+                     "movie_ids", "movie_titles", "movie_years"):
+            table = getattr(self, name)
+            arrays[name + ".data"] = table.data
+            arrays[name + ".offsets"] = table.offsets
+
+        # Sections are laid out on 8-byte boundaries, relative to the
+        # start of the data region that follows the header
+        sections = {}
+        offset = 0
+        for name, values in arrays.items():
+            values = memoryview(values)
+            sections[name] = [values.format, offset, values.nbytes]
+            offset = _align(offset + values.nbytes)
+        header = json.dumps({
+            "byteorder": sys.byteorder,
+            "fingerprint": fingerprint,
+            "sections": sections,
+        }).encode("utf-8")
+
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(struct.pack("<II", SNAPSHOT_VERSION, len(header)))
+            f.write(header)
+            f.write(bytes(_align(f.tell()) - f.tell()))
+            for name, values in arrays.items():
+                values = memoryview(values).cast("B")
+                f.write(values)
+                f.write(bytes(_align(len(values)) - len(values)))
+        os.replace(temporary, path)
+
+    @property
+    def num_people(self):
+        return len(self.person_offsets) - 1
+
+    @property
+    def num_movies(self):
+        return len(self.movie_offsets) - 1
+
+    def index_of_person(self, person_id):
+        """
+        Returns the index of the person with a given IMDB id, or None.
+        """
+        ids = self.person_ids
+        i = bisect_left(self.id_order, person_id, key=lambda p: ids[p])
+        if i < len(self.id_order) and ids[self.id_order[i]] == person_id:
+            return self.id_order[i]
+        return None
+
+    def index_of_movie(self, movie_id):
+        """
+        Returns the index of the movie with a given IMDB id, or None.
+        """
+        ids = self.movie_ids
+        i = bisect_left(self.movie_order, movie_id, key=lambda m: ids[m])
+        if i < len(self.movie_order) and ids[self.movie_order[i]] == movie_id:
+            return self.movie_order[i]
+        return None
+
+    def people_named(self, name):
+        """
+        Returns indexes of all people whose name matches, ignoring case.
+        """
+        names = self.person_names
+        name = name.lower()
+        lo = bisect_left(self.name_order, name,
+                         key=lambda p: names[p].lower())
+        hi = bisect_right(self.name_order, name, lo=lo,
+                          key=lambda p: names[p].lower())
+        return list(self.name_order[lo:hi])
+
+    def movies_of(self, person):
+        return self.person_movies[
+            self.person_offsets[person]:self.person_offsets[person + 1]
+        ]
+
+    def stars_of(self, movie):
+        return self.movie_stars[
+            self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+        ]
+
+    def neighbors(self, person):
+        """
+        Returns (movie, person) index pairs for people who starred
+        with a given person.
+        """
+        neighbors = set()
+        for movie in self.movies_of(person):
+            for star in self.stars_of(movie):
+                neighbors.add((movie, star))
+        return neighbors
+
+    def component_report(self, top=10):
+        """
+        Returns the number of connected components, the sizes of the
+        largest ones and how many people are isolated.
+        """
+        if self.component_sizes is None:
+            self.component_sizes = component_sizes(self.components)
+        return component_report(self.component_sizes, top)
+
+    def shortest_path(self, source, target, limit=None):
+        """
+        Returns the shortest list of (movie, person) index pairs that
+        connect source to target, or None if they are not connected.
+        With a limit, paths longer than limit are not searched for and
+        None is returned instead.
+        """
+        if source == target:
+            return []
+        if self.components[source] != self.components[target]:
+            return None
+
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+
+        forward = {source: None}
+        backward = {target: None}
+        forward_frontier = [source]
+        backward_frontier = [target]
+
+        # Every path of up to depth steps has been ruled out
+        depth = 0
+
+        while forward_frontier and backward_frontier:
+            if limit is not None and depth >= limit:
+                return None
+            depth += 1
+            if len(forward_frontier) <= len(backward_frontier):
+                frontier, parents, others = forward_frontier, forward, backward
+            else:
+                frontier, parents, others = backward_frontier, backward, forward
+
+            next_frontier = []
+            for person in frontier:
+                for k in range(person_offsets[person],
+                               person_offsets[person + 1]):
+                    movie = person_movies[k]
+                    for j in range(movie_offsets[movie],
+                                   movie_offsets[movie + 1]):
+                        neighbor = movie_stars[j]
+                        if neighbor in parents:
+                            continue
+                        parents[neighbor] = (movie, person)
+                        if neighbor in others:
+                            return join_paths(forward, backward, neighbor)
+                        next_frontier.append(neighbor)
+
+            if parents is forward:
+                forward_frontier = next_frontier
+            else:
+                backward_frontier = next_frontier
+
+        return None
+
+
+def label_components(size, groups):
+    """
+    Labels the connected components of `size` nodes joined by groups
+    (iterables of nodes that are all connected to each other) using
+    union-find. Labels are numbered from the largest component down.
+    """
+    parent = array("i", range(size))
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for group in groups:
+        group = iter(group)
+        first = next(group, None)
+        if first is None:
+            continue
+        root = find(first)
+        for node in group:
+            other = find(node)
+            if other != root:
+                parent[other] = root
+
+    sizes = {}
+    for node in range(size):
+        root = find(node)
+        sizes[root] = sizes.get(root, 0) + 1
+    order = sorted(sizes, key=lambda root: (-sizes[root], root))
+    label = {root: i for i, root in enumerate(order)}
+
+    labels = array("i", bytes(4 * size))
+    for node in range(size):
+        labels[node] = label[find(node)]
+    return labels
+
+
+def component_sizes(labels):
+    """
+    Returns the size of each component, indexed by label.
+    """
+    sizes = array("i")
+    for label in labels:
+        if label >= len(sizes):
+            sizes.extend([0] * (label + 1 - len(sizes)))
+        sizes[label] += 1
+    return sizes
+
+
+def component_report(sizes, top=10):
+    """
+    Summarises a list of component sizes.
+    """
+    return {
+        "components": len(sizes),
+        "largest": sorted(sizes, reverse=True)[:top],
+        "isolated": sum(1 for size in sizes if size == 1),
+    }
+
+
+def read_rows(path, *columns):
+    """
+    Streams tuples of the named columns from a CSV file. Columns are
+    located once from the header and then read by position, without
+    building a dictionary per row. Rows too short to hold every
+    column are skipped.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        try:
+            positions = [header.index(column) for column in columns]
+        except ValueError:
+            raise ValueError(f"{path} must have columns {', '.join(columns)}")
+        width = max(positions) + 1
+        for row in reader:
+            if len(row) >= width:
+                yield tuple(row[i] for i in positions)
+
+
+def starring_people(directory, movie_ids):
+    """
+    Returns the set of person ids that starred in any of movie_ids.
+    """
+    wanted = set()
+    for person_id, movie_id in read_rows(f"{directory}/stars.csv",
+                                         "person_id", "movie_id"):
+        if movie_id in movie_ids:
+            wanted.add(person_id)
+    return wanted
+
+
+def new_load_stats():
+    """
+    Returns zeroed counters describing what a loader kept and dropped.
+    """
+    return dict.fromkeys((
+        "people", "movies", "edges",
+        "filtered_people", "filtered_movies", "filtered_edges",
+        "dangling_person_edges", "dangling_movie_edges", "duplicate_edges",
+    ), 0)
+
+
+def load_cached(directory, path=None):
+    """
+    Load the graph for a directory of CSV files, reusing the snapshot
+    at `path` (default: degrees.snapshot inside the directory) when it
+    was built from the same files, and rebuilding it otherwise.
+    """
+    if path is None:
+        path = os.path.join(directory, "degrees.snapshot")
+
+    try:
+        graph, header = Graph.load(path)
+    except (OSError, ValueError, KeyError, struct.error):
+        graph = None
+    if graph is not None:
+        fingerprint = check_fingerprint(directory, header["fingerprint"])
+        if fingerprint is not None:
+            # Files that were only touched are hashed once, not on
+            # every start
+            if fingerprint != header["fingerprint"]:
+                graph.save(path, fingerprint)
+            return graph
+
+    graph = Graph.from_csv(directory)
+    graph.save(path, fingerprint_csv(directory))
+    return graph
+
+
+def fingerprint_csv(directory):
+    """
+    Returns size, modification time and SHA-256 digest of each CSV file.
+    """
+    fingerprint = {}
+    for filename in CSV_FILES:
+        path = os.path.join(directory, filename)
+        stat = os.stat(path)
+        fingerprint[filename] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "sha256": _digest(path),
+        }
+    return fingerprint
+
+
+def check_fingerprint(directory, fingerprint):
+    """
+    Checks a stored fingerprint against the CSV files on disk. Size
+    and modification time are compared first; the digest is only
+    recomputed when the size matches but the file was touched.
+
+    Returns None if the files changed, otherwise the fingerprint with
+    the modification times of touched files brought up to date, so the
+    caller can store it and skip hashing them next time.
+    """
+    if not fingerprint:
+        return None
+    current = {}
+    for filename in CSV_FILES:
+        path = os.path.join(directory, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        stored = fingerprint.get(filename)
+        if stored is None or stored["size"] != stat.st_size:
+            return None
+        if stored["mtime"] != stat.st_mtime_ns:
+            if stored["sha256"] != _digest(path):
+                return None
+            stored = dict(stored, mtime=stat.st_mtime_ns)
+        current[filename] = stored
+    return current
+
+
+def _digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_header(mapping, magic=SNAPSHOT_MAGIC, version=SNAPSHOT_VERSION):
+    """
+    Validates the preamble of a snapshot, or of another file laid out
+    the same way with its own magic and version. Returns the decoded
+    header and the offset where the data region starts.
+    """
+    size = len(magic)
+    if mapping[:size] != magic:
+        raise ValueError(f"not a {magic.rstrip(bytes(1)).decode()} file")
+    found, length = struct.unpack("<II", mapping[size:size + 8])
+    if found != version:
+        raise ValueError(f"unsupported file version {found}")
+    header = json.loads(bytes(mapping[size + 8:size + 8 + length]))
+    if header["byteorder"] != sys.byteorder:
+        raise ValueError("file was written on a different platform")
+    return header, _align(size + 8 + length)
+
+
+def _align(offset):
+    return -(-offset // 8) * 8
+
+
+def join_paths(forward, backward, meeting):
+    """
+    Builds the (movie, person) path through the node where a forward
+    and a backward search met. Each search maps a node to the
+    (movie, node) step leading back to where it started.
+    """
+    path = []
+    node = meeting
+    while forward[node] is not None:
+        movie, previous = forward[node]
+        path.append((movie, node))
+        node = previous
+    path.reverse()
+
+    node = meeting
+    while backward[node] is not None:
+        movie, following = backward[node]
+        path.append((movie, following))
+        node = following
+
+    return path
+
+
+def _group(keys, values, size):
+    """
+    Counting sort of values by key into CSR (offsets, targets) arrays.
+    """
+    offsets = array("i", bytes(4 * (size + 1)))
+    for key in keys:
+        offsets[key + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    targets = array("i", bytes(4 * len(values)))
+    cursor = array("i", offsets[:-1])
+    for key, value in zip(keys, values):
+        targets[cursor[key]] = value
+        cursor[key] += 1
+
+    return offsets, targets
@@ -0,0 +1,214 @@
+"""
+Landmark distance index for the compact degrees graph.
+
+Breadth-first distances from a few well-connected people bound the
+degrees of separation between any pair through the triangle
+inequality, and let a path search stop early when a route through a
+landmark is provably shortest (ALT).
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from graph import _align, _read_header, check_fingerprint
+
+LANDMARK_MAGIC = b"LANDMARK"
+LANDMARK_VERSION = 2
+
+# Distances are stored one byte per person; this marks unreachable
+UNREACHABLE = 255
+
+
+class LandmarkIndex():
+    """
+    Distances from each landmark person to every person in a graph.
+    """
+
+    def __init__(self, landmarks, distances, num_people, num_edges,
+                 fingerprint=None):
+        self.landmarks = landmarks
+        self.distances = distances
+        self.num_people = num_people
+        self.num_edges = num_edges
+
+        # Fingerprint of the CSV files the index was built from
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, graph, count=16, fingerprint=None):
+        """
+        Pick the `count` people with the most co-stars and run a
+        breadth-first search from each of them.
+        """
+        degree = []
+        for person in range(graph.num_people):
+            total = 0
+            for movie in graph.movies_of(person):
+                total += graph.movie_offsets[movie + 1] - graph.movie_offsets[movie]
+            degree.append(total)
+        landmarks = sorted(range(graph.num_people),
+                           key=lambda p: degree[p], reverse=True)[:count]
+
+        distances = [distances_from(graph, landmark) for landmark in landmarks]
+        return cls(landmarks, distances, graph.num_people,
+                   len(graph.person_movies), fingerprint)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-map an index written by `save`.
+        """
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header, start = _read_header(mapping, LANDMARK_MAGIC, LANDMARK_VERSION)
+
+        buffer = memoryview(mapping)
+        num_people = header["num_people"]
+        if start + len(header["landmarks"]) * num_people > len(mapping):
+            raise ValueError("landmark index is truncated")
+        distances = []
+        for i in range(len(header["landmarks"])):
+            offset = start + i * num_people
+            distances.append(buffer[offset:offset + num_people])
+
+        index = cls(header["landmarks"], distances,
+                    num_people, header["num_edges"], header["fingerprint"])
+        index.mapping = mapping
+        return index
+
+    def save(self, path):
+        """
+        Write the index to disk, one byte per person per landmark.
+        """
+        header = json.dumps({
+            "byteorder": sys.byteorder,
+            "fingerprint": self.fingerprint,
+            "landmarks": list(self.landmarks),
+            "num_people": self.num_people,
+            "num_edges": self.num_edges,
+        }).encode("utf-8")
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(LANDMARK_MAGIC)
+            f.write(struct.pack("<II", LANDMARK_VERSION, len(header)))
+            f.write(header)
+            f.write(bytes(_align(f.tell()) - f.tell()))
+            for distances in self.distances:
+                f.write(distances)
+        os.replace(temporary, path)
+
+    def matches(self, graph, directory):
+        """
+        Checks that the index was built for this graph from the CSV
+        files in directory as they are now. Brings the stored
+        modification times up to date when only those changed.
+        """
+        if (self.num_people != graph.num_people
+                or self.num_edges != len(graph.person_movies)):
+            return False
+        fingerprint = check_fingerprint(directory, self.fingerprint)
+        if fingerprint is None:
+            return False
+        self.fingerprint = fingerprint
+        return True
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation
+        between two people. Both are None if the landmarks prove the
+        people are not connected; upper is None if no landmark reaches
+        both of them.
+        """
+        if source == target:
+            return 0, 0
+        lower = 0
+        upper = None
+        for distances in self.distances:
+            s, t = distances[source], distances[target]
+            if (s == UNREACHABLE) != (t == UNREACHABLE):
+                return None, None
+            if s == UNREACHABLE:
+                continue
+            lower = max(lower, abs(s - t))
+            if upper is None or s + t < upper:
+                upper = s + t
+        return max(lower, 1), upper
+
+    def shortest_path(self, graph, source, target):
+        """
+        Returns the shortest list of (movie, person) index pairs that
+        connect source to target, or None if they are not connected.
+
+        The best route through a landmark has length upper, so the
+        graph's bidirectional search only has to look for something
+        shorter, stopping before its last and largest layer. If it
+        finds nothing, the route through the landmark is shortest.
+        """
+        if source == target:
+            return []
+
+        best = None
+        for distances in self.distances:
+            s, t = distances[source], distances[target]
+            if (s == UNREACHABLE) != (t == UNREACHABLE):
+                return None
+            if s != UNREACHABLE and (best is None or s + t < best[0]):
+                best = (s + t, distances)
+        if best is None:
+            return graph.shortest_path(source, target)
+
+        upper, distances = best
+        path = graph.shortest_path(source, target, limit=upper - 1)
+        if path is not None:
+            return path
+
+        # Walk down to the landmark from both ends, then reverse the
+        # walk from the target so the path runs landmark to target
+        forward = descend(graph, distances, source)
+        backward = descend(graph, distances, target)
+        people = [target] + [person for _, person in backward]
+        return forward + [(backward[i][0], people[i])
+                          for i in reversed(range(len(backward)))]
+
+
+def descend(graph, distances, person):
+    """
+    Returns (movie, person) steps from person to a landmark, each to
+    someone one step closer to it.
+    """
+    steps = []
+    while distances[person] > 0:
+        closer = distances[person] - 1
+        step = next((movie, neighbor)
+                    for movie in graph.movies_of(person)
+                    for neighbor in graph.stars_of(movie)
+                    if distances[neighbor] == closer)
+        steps.append(step)
+        person = step[1]
+    return steps
+
+
+def distances_from(graph, source):
+    """
+    Returns a byte array of breadth-first distances from source to
+    every person, with UNREACHABLE for people in other components.
+    """
+    distances = array("B", [UNREACHABLE]) * graph.num_people
+    distances[source] = 0
+    frontier = [source]
+    depth = 0
+    while frontier and depth < UNREACHABLE - 1:
+        depth += 1
+        next_frontier = []
+        for person in frontier:
+            for movie in graph.movies_of(person):
+                for neighbor in graph.stars_of(movie):
+                    if distances[neighbor] == UNREACHABLE:
+                        distances[neighbor] = depth
+                        next_frontier.append(neighbor)
+        frontier = next_frontier
+    return distances
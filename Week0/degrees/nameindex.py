@@ -0,0 +1,166 @@
+"""
+Name lookup index for degrees.
+
+Names are normalised (case, accents and whitespace folded) and kept in
+sorted order for exact and prefix lookups. Fuzzy lookups use a trigram
+inverted index to find candidates sharing enough trigrams with the
+query, which are then checked with a bounded edit distance, so no
+query scans every name.
+"""
+
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+# Length of the grams in the fuzzy candidate index
+GRAM = 3
+
+
+class NameIndex():
+    """
+    Index of people by name, ranking matches by how many movies
+    each person starred in.
+    """
+
+    def __init__(self, entries):
+        """
+        entries is an iterable of (person_id, name, number_of_movies).
+        """
+        people = sorted(
+            ((normalize(name), person_id, movie_count)
+             for person_id, name, movie_count in entries),
+            key=lambda entry: entry[0]
+        )
+        self.keys = [key for key, _, _ in people]
+        self.person_ids = [person_id for _, person_id, _ in people]
+        self.movie_counts = array("i", (count for _, _, count in people))
+
+        # Trigram -> positions in self.keys of names containing it
+        grams = defaultdict(lambda: array("i"))
+        for position, key in enumerate(self.keys):
+            if position and key == self.keys[position - 1]:
+                continue
+            for gram in set(_grams(key)):
+                grams[gram].append(position)
+        self.grams = dict(grams)
+
+    def exact(self, name):
+        """
+        Returns person_ids whose name matches, most movies first.
+        """
+        key = normalize(name)
+        lo = bisect_left(self.keys, key)
+        hi = bisect_right(self.keys, key, lo=lo)
+        return self._rank(range(lo, hi))
+
+    def prefix(self, prefix, limit=10):
+        """
+        Returns up to limit person_ids whose name starts with prefix,
+        most movies first.
+        """
+        key = normalize(prefix)
+        lo = bisect_left(self.keys, key)
+        hi = bisect_left(self.keys, key + "\uffff", lo=lo)
+        return self._rank(range(lo, hi))[:limit]
+
+    def fuzzy(self, name, max_distance=2, limit=10):
+        """
+        Returns up to limit (person_id, distance) pairs for names within
+        max_distance edits of name, closest and then most movies first.
+        """
+        key = normalize(name)
+        grams = _grams(key)
+
+        # Each edit destroys at most GRAM grams, so a match must share
+        # this many grams with the query; when the bound is useless,
+        # fall back to every name of a compatible length
+        needed = len(grams) - max_distance * GRAM
+        if needed > 0:
+            shared = defaultdict(int)
+            for gram in grams:
+                for position in self.grams.get(gram, ()):
+                    shared[position] += 1
+            candidates = [p for p, count in shared.items() if count >= needed]
+        else:
+            candidates = [
+                p for p in range(len(self.keys))
+                if abs(len(self.keys[p]) - len(key)) <= max_distance
+                and (p == 0 or self.keys[p] != self.keys[p - 1])
+            ]
+
+        matches = []
+        for position in candidates:
+            distance = edit_distance(key, self.keys[position], max_distance)
+            if distance is None:
+                continue
+
+            # Every person sharing this name matches equally well
+            candidate = self.keys[position]
+            end = bisect_right(self.keys, candidate, lo=position)
+            for i in range(position, end):
+                matches.append((distance, -self.movie_counts[i],
+                                self.person_ids[i]))
+
+        matches.sort()
+        return [(person_id, distance)
+                for distance, _, person_id in matches[:limit]]
+
+    def resolve(self, name):
+        """
+        Returns the single best person_id for a name and the way it was
+        matched ("exact", "fuzzy" or "prefix"), or (None, None).
+        Ties are broken by number of movies.
+        """
+        matches = self.exact(name)
+        if matches:
+            return matches[0], "exact"
+        max_distance = 1 if len(normalize(name)) <= 5 else 2
+        matches = self.fuzzy(name, max_distance, limit=1)
+        if matches:
+            return matches[0][0], "fuzzy"
+        matches = self.prefix(name, limit=1)
+        if matches:
+            return matches[0], "prefix"
+        return None, None
+
+    def _rank(self, positions):
+        return [self.person_ids[i] for i in sorted(
+            positions, key=lambda i: (-self.movie_counts[i], self.person_ids[i])
+        )]
+
+
+def normalize(name):
+    """
+    Folds case, accents and runs of whitespace in a name.
+    """
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return " ".join(name.casefold().split())
+
+
+def edit_distance(a, b, limit):
+    """
+    Returns the Levenshtein distance between a and b, or None if it is
+    greater than limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb)
+            ))
+        if min(current) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+def _grams(key):
+    padded = " " * (GRAM - 1) + key + " " * (GRAM - 1)
+    return [padded[i:i + GRAM] for i in range(len(padded) - GRAM + 1)]
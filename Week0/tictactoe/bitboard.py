@@ -0,0 +1,139 @@
+"""
+Bitboard representation of Tic Tac Toe positions.
+
+A position is a pair of 9-bit masks (x, o) holding the cells taken by
+each player, where cell (i, j) is bit 3 * i + j. Win detection, move
+generation and symmetry reduction are table lookups and bit operations,
+so the search never copies or scans a list board.
+"""
+
+X = "X"
+O = "O"
+
+FULL = 0b111111111
+
+CELLS = [(i, j) for i in range(3) for j in range(3)]
+
+LINES = [
+    0b000000111, 0b000111000, 0b111000000,  # rows
+    0b001001001, 0b010010010, 0b100100100,  # columns
+    0b100010001, 0b001010100,               # diagonals
+]
+
+# WINS[mask] is True if the cells in mask complete a line
+WINS = [any(mask & line == line for line in LINES) for mask in range(512)]
+
+# Bits set in each 9-bit mask
+POPCOUNT = [bin(mask).count("1") for mask in range(512)]
+
+
+def _symmetries():
+    """
+    Returns the eight rotations and reflections of the board, each as
+    the list of cell indexes it reads the cells from.
+    """
+    transforms = []
+    for turns in range(4):
+        for reflect in (False, True):
+            permutation = []
+            for i, j in CELLS:
+                for _ in range(turns):
+                    i, j = j, 2 - i
+                if reflect:
+                    j = 2 - j
+                permutation.append(3 * i + j)
+            transforms.append(permutation)
+    return transforms
+
+
+SYMMETRIES = _symmetries()
+
+# TRANSFORMS[s][mask] is mask with symmetry s applied
+TRANSFORMS = [
+    [sum(1 << k for k in range(9) if mask >> permutation[k] & 1)
+     for mask in range(512)]
+    for permutation in SYMMETRIES
+]
+
+
+def from_board(board):
+    """
+    Returns the (x, o) masks of a list-of-lists board.
+    """
+    x = o = 0
+    for k, (i, j) in enumerate(CELLS):
+        if board[i][j] == X:
+            x |= 1 << k
+        elif board[i][j] == O:
+            o |= 1 << k
+    return x, o
+
+
+def to_board(x, o):
+    """
+    Returns the list-of-lists board for a pair of masks.
+    """
+    return [[X if x >> (3 * i + j) & 1 else O if o >> (3 * i + j) & 1 else None
+             for j in range(3)] for i in range(3)]
+
+
+def player(x, o):
+    """
+    Returns the player to move; X moves first.
+    """
+    return X if POPCOUNT[x] == POPCOUNT[o] else O
+
+
+def winner(x, o):
+    if WINS[x]:
+        return X
+    if WINS[o]:
+        return O
+    return None
+
+
+def terminal(x, o):
+    return WINS[x] or WINS[o] or (x | o) == FULL
+
+
+def utility(x, o):
+    if WINS[x]:
+        return 1
+    if WINS[o]:
+        return -1
+    return 0
+
+
+def moves(x, o):
+    """
+    Returns the indexes of the empty cells.
+    """
+    free = FULL & ~(x | o)
+    return [k for k in range(9) if free >> k & 1]
+
+
+def play(x, o, k):
+    """
+    Returns the masks after the player to move takes cell k.
+    """
+    if POPCOUNT[x] == POPCOUNT[o]:
+        return x | 1 << k, o
+    return x, o | 1 << k
+
+
+def canonical(x, o):
+    """
+    Returns one integer key shared by all eight rotations and
+    reflections of a position.
+    """
+    return min(table[x] | table[o] << 9 for table in TRANSFORMS)
+
+
+def canonical_symmetry(x, o):
+    """
+    Returns the canonical key of a position and the index of a
+    symmetry that produces it. Cell k of the canonical position is
+    cell SYMMETRIES[s][k] of the original.
+    """
+    return min((table[x] | table[o] << 9, s)
+               for s, table in enumerate(TRANSFORMS))
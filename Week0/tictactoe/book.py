@@ -0,0 +1,122 @@
+"""
+Perfect-play opening book for Tic Tac Toe
+
+Solves the whole game once and stores the best move for every
+reachable position, up to rotation and reflection, so the AI can
+answer with a single table lookup.
+
+Usage: python book.py [path]
+"""
+
+import os
+import struct
+import sys
+from array import array
+
+import bitboard
+
+BOOK_MAGIC = b"TTTBOOK\0"
+BOOK_VERSION = 1
+
+# Default location of the book, next to this file
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+# Preferred cells among equally good moves: centre, corners, edges
+PREFERENCE = [4, 0, 2, 6, 8, 1, 3, 5, 7]
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python book.py [path]")
+    path = sys.argv[1] if len(sys.argv) == 2 else BOOK_PATH
+    book = solve()
+    save(path, book)
+    print(f"Wrote {len(book)} positions to {path}")
+
+
+def solve():
+    """
+    Returns a dictionary mapping the canonical key of every reachable,
+    unfinished position to the best cell in that canonical orientation.
+
+    Among moves with the same game result, quicker wins and slower
+    losses are preferred.
+    """
+    scores = {}
+
+    def score(x, o):
+        """Score for X: +/-(10 - stones) for a win/loss, 0 for a draw."""
+        key = bitboard.canonical(x, o)
+        if key not in scores:
+            if bitboard.terminal(x, o):
+                scores[key] = bitboard.utility(x, o) * (10 - bitboard.POPCOUNT[x | o])
+            elif bitboard.player(x, o) == bitboard.X:
+                scores[key] = max(score(*bitboard.play(x, o, k))
+                                  for k in bitboard.moves(x, o))
+            else:
+                scores[key] = min(score(*bitboard.play(x, o, k))
+                                  for k in bitboard.moves(x, o))
+        return scores[key]
+
+    book = {}
+    frontier = [(0, 0)]
+    while frontier:
+        x, o = frontier.pop()
+        key = bitboard.canonical(x, o)
+        if key in book or bitboard.terminal(x, o):
+            continue
+
+        # Decode the canonical orientation so the stored cell needs
+        # no transform when the lookup side canonicalizes the same way
+        cx, co = key & bitboard.FULL, key >> 9
+        sign = 1 if bitboard.player(cx, co) == bitboard.X else -1
+        moves = [k for k in PREFERENCE if not (cx | co) >> k & 1]
+        book[key] = max(moves, key=lambda k: (
+            sign * score(*bitboard.play(cx, co, k)), -PREFERENCE.index(k)
+        ))
+        for k in moves:
+            frontier.append(bitboard.play(cx, co, k))
+
+    return book
+
+
+def save(path, book):
+    """
+    Writes the book as sorted 32-bit keys followed by one byte per move.
+    """
+    keys = array("I", sorted(book))
+    moves = bytes(book[key] for key in keys)
+    with open(path, "wb") as f:
+        f.write(BOOK_MAGIC)
+        f.write(struct.pack("<II", BOOK_VERSION, len(keys)))
+        if sys.byteorder != "little":
+            keys.byteswap()
+        f.write(keys.tobytes())
+        f.write(moves)
+
+
+def load(path=BOOK_PATH):
+    """
+    Reads a book written by save. Returns an empty book if the file
+    is missing or unreadable, so callers fall back to search.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return {}
+    header = len(BOOK_MAGIC) + 8
+    if data[:len(BOOK_MAGIC)] != BOOK_MAGIC or len(data) < header:
+        return {}
+    version, count = struct.unpack("<II", data[len(BOOK_MAGIC):header])
+    if version != BOOK_VERSION or len(data) != header + 5 * count:
+        return {}
+    keys = array("I")
+    keys.frombytes(data[header:header + 4 * count])
+    if sys.byteorder != "little":
+        keys.byteswap()
+    return dict(zip(keys, data[header + 4 * count:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+"""
+m,n,k-game engine
+
+Generalises Tic Tac Toe to an m x n board won by k in a row (3,3,3 is
+Tic Tac Toe, 15,15,5 is gomoku). Boards use the same list-of-lists
+representation and X, O and EMPTY values as tictactoe.
+
+Full minimax is only feasible on tiny boards, so best_move runs an
+iterative-deepening alpha-beta search under a time budget and scores
+positions at the depth limit with a heuristic that counts the lines
+each player can still complete.
+"""
+
+import argparse
+import math
+import multiprocessing
+import time
+
+from tictactoe import X, O, EMPTY
+
+# Score of a won position; faster wins score higher
+WIN = 1_000_000
+
+# Scores at least this large are wins found by search
+WIN_THRESHOLD = WIN - 10_000
+
+
+# Game used by root-split worker processes, set by _init_worker
+_worker_game = None
+
+
+class Timeout(Exception):
+    pass
+
+
+class Game():
+    """
+    Rules and search for one board size and line length.
+    """
+
+    def __init__(self, m=3, n=3, k=3, radius=None):
+        """
+        m rows, n columns, k in a row to win. If radius is set, search
+        only considers empty cells within that many steps of a stone,
+        which keeps the branching factor down on large boards.
+        """
+        if k > max(m, n):
+            raise ValueError("k cannot be longer than the board")
+        self.m, self.n, self.k = m, n, k
+        self.size = m * n
+        self.full = (1 << self.size) - 1
+        self.radius = radius
+
+        # Every run of k cells in a row, column or diagonal, as masks,
+        # and the runs through each cell
+        self.lines = []
+        for r in range(m):
+            for c in range(n):
+                for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_r, end_c = r + dr * (k - 1), c + dc * (k - 1)
+                    if 0 <= end_r < m and 0 <= end_c < n:
+                        self.lines.append(sum(
+                            1 << self.index(r + dr * i, c + dc * i)
+                            for i in range(k)
+                        ))
+        self.lines_through = [
+            [line for line in self.lines if line >> cell & 1]
+            for cell in range(self.size)
+        ]
+
+        # Cells nearest the centre are tried first
+        self.order = sorted(range(self.size), key=lambda cell: (
+            abs(cell // n - (m - 1) / 2) + abs(cell % n - (n - 1) / 2), cell
+        ))
+        if radius is not None:
+            self.neighborhood = [
+                sum(1 << self.index(r, c)
+                    for r in range(max(0, cell // n - radius),
+                                   min(m, cell // n + radius + 1))
+                    for c in range(max(0, cell % n - radius),
+                                   min(n, cell % n + radius + 1)))
+                for cell in range(self.size)
+            ]
+
+        # Heuristic weight of a line holding i stones of one player
+        self.weights = [0] + [10 ** i for i in range(k - 1)] + [WIN]
+
+        self.transposition_table = {}
+        self.stats = {"nodes": 0, "depth": 0}
+
+    def index(self, i, j):
+        return i * self.n + j
+
+    def initial_state(self):
+        return [[EMPTY] * self.n for _ in range(self.m)]
+
+    def from_board(self, board):
+        """
+        Returns the (x, o) bitboards of a list-of-lists board.
+        """
+        x = o = 0
+        for i in range(self.m):
+            for j in range(self.n):
+                if board[i][j] == X:
+                    x |= 1 << self.index(i, j)
+                elif board[i][j] == O:
+                    o |= 1 << self.index(i, j)
+        return x, o
+
+    def player(self, board):
+        x, o = self.from_board(board)
+        return X if x.bit_count() == o.bit_count() else O
+
+    def actions(self, board):
+        return {(i, j) for i in range(self.m) for j in range(self.n)
+                if board[i][j] == EMPTY}
+
+    def result(self, board, action):
+        i, j = action
+        if not (0 <= i < self.m and 0 <= j < self.n) or board[i][j] != EMPTY:
+            raise ValueError("Not a Valid Action!")
+        board = [list(row) for row in board]
+        board[i][j] = self.player(board)
+        return board
+
+    def winner(self, board):
+        x, o = self.from_board(board)
+        if self.has_line(x):
+            return X
+        if self.has_line(o):
+            return O
+        return None
+
+    def terminal(self, board):
+        x, o = self.from_board(board)
+        return self.has_line(x) or self.has_line(o) or (x | o) == self.full
+
+    def has_line(self, stones):
+        return any(stones & line == line for line in self.lines)
+
+    def completes_line(self, stones, cell):
+        """
+        Returns True if cell is part of a complete line in stones.
+        """
+        return any(stones & line == line for line in self.lines_through[cell])
+
+    def evaluate(self, me, opponent):
+        """
+        Heuristic score for the player who owns `me`: lines only one
+        player can still complete count for that player, weighted by
+        how many stones they already hold.
+        """
+        score = 0
+        weights = self.weights
+        for line in self.lines:
+            mine = line & me
+            theirs = line & opponent
+            if not theirs:
+                score += weights[mine.bit_count()]
+            elif not mine:
+                score -= weights[theirs.bit_count()]
+        return score
+
+    def moves(self, me, opponent, first=None):
+        """
+        Returns the empty cells to search, most promising first.
+        """
+        taken = me | opponent
+        allowed = self.full & ~taken
+        if self.radius is not None and taken:
+            near = 0
+            stones = taken
+            while stones:
+                low = stones & -stones
+                near |= self.neighborhood[low.bit_length() - 1]
+                stones ^= low
+            allowed &= near
+        moves = [cell for cell in self.order if allowed >> cell & 1]
+        if first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
+
+    def best_move(self, board, time_limit=1.0, max_depth=None):
+        """
+        Returns the best action (i, j) found for the player to move
+        within time_limit seconds, or None if the game is over.
+        Search statistics are left in self.stats.
+        """
+        x, o = self.from_board(board)
+        if self.has_line(x) or self.has_line(o) or (x | o) == self.full:
+            return None
+        me, opponent = (x, o) if x.bit_count() == o.bit_count() else (o, x)
+
+        deadline = time.perf_counter() + time_limit
+        empty = self.size - (x | o).bit_count()
+        if max_depth is None or max_depth > empty:
+            max_depth = empty
+        self.stats = {"nodes": 0, "depth": 0}
+
+        best = self.moves(me, opponent)[0]
+        for depth in range(1, max_depth + 1):
+            try:
+                score, move = self.search_root(me, opponent, depth, deadline)
+            except Timeout:
+                break
+            best = move
+            self.stats["depth"] = depth
+            self.stats["score"] = score
+            if abs(score) >= WIN_THRESHOLD:
+                break
+        return divmod(best, self.n)
+
+    def split_position(self, board):
+        """
+        Returns (me, opponent) bitboards for the player to move.
+        """
+        x, o = self.from_board(board)
+        return (x, o) if x.bit_count() == o.bit_count() else (o, x)
+
+    def fixed_depth_move(self, board, depth):
+        """
+        Returns the best action found by a serial search to exactly
+        depth plies, ignoring any time budget.
+        """
+        if self.terminal(board):
+            return None
+        me, opponent = self.split_position(board)
+        self.stats = {"nodes": 0, "depth": depth}
+        scores = []
+        alpha = -math.inf
+        moves = self.moves(me, opponent)
+        for cell in moves:
+            score = self.score_move(me, opponent, cell, depth, alpha,
+                                    math.inf, 0, math.inf)
+            scores.append(score)
+            alpha = max(alpha, score)
+        return divmod(_first_best(moves, scores), self.n)
+
+    def parallel_move(self, board, depth, workers=None):
+        """
+        Returns the best action found by searching root moves to depth
+        plies in a pool of worker processes.
+
+        The first (most promising) move is searched here to get a
+        bound, and the remaining moves are split across the workers
+        with that bound so they can still be pruned. Scores are merged
+        in move order, so the answer matches fixed_depth_move whatever
+        order workers finish in.
+        """
+        if self.terminal(board):
+            return None
+        me, opponent = self.split_position(board)
+        moves = self.moves(me, opponent)
+        self.stats = {"nodes": 0, "depth": depth}
+        alpha = self.score_move(me, opponent, moves[0], depth, -math.inf,
+                                math.inf, 0, math.inf)
+        jobs = [(me, opponent, cell, depth, alpha) for cell in moves[1:]]
+        scores = [alpha]
+        if jobs:
+            with multiprocessing.Pool(
+                workers, initializer=_init_worker,
+                initargs=(self.m, self.n, self.k, self.radius)
+            ) as pool:
+                scores += pool.starmap(_score_root_move, jobs)
+        return divmod(_first_best(moves, scores), self.n)
+
+    def search_root(self, me, opponent, depth, deadline):
+        """
+        One iteration of the deepening loop. Returns (score, cell).
+        """
+        entry = self.transposition_table.get((me, opponent))
+        first = entry[3] if entry else None
+        alpha, beta = -math.inf, math.inf
+        best = None
+        for cell in self.moves(me, opponent, first):
+            score = self.score_move(me, opponent, cell, depth, alpha, beta,
+                                    0, deadline)
+            if score > alpha:
+                alpha, best = score, cell
+        self.transposition_table[(me, opponent)] = (depth, 0, alpha, best)
+        return alpha, best
+
+    def score_move(self, me, opponent, cell, depth, alpha, beta, ply,
+                   deadline):
+        """
+        Score, for the player to move, of playing cell.
+        """
+        stones = me | 1 << cell
+        if self.completes_line(stones, cell):
+            return WIN - ply - 1
+        if (stones | opponent) == self.full:
+            return 0
+        return -self.negamax(opponent, stones, depth - 1, -beta, -alpha,
+                             ply + 1, deadline)
+
+    def negamax(self, me, opponent, depth, alpha, beta, ply, deadline):
+        """
+        Alpha-beta search from the point of view of the player to move,
+        whose stones are `me`.
+        """
+        stats = self.stats
+        stats["nodes"] += 1
+        if stats["nodes"] & 1023 == 0 and time.perf_counter() > deadline:
+            raise Timeout
+
+        if depth == 0:
+            return self.evaluate(me, opponent)
+
+        # Flags: 0 exact, -1 upper bound, 1 lower bound
+        key = (me, opponent)
+        entry = self.transposition_table.get(key)
+        first = None
+        if entry is not None:
+            entry_depth, flag, value, first = entry
+            value = _from_table(value, ply)
+            if entry_depth >= depth:
+                if flag == 0:
+                    return value
+                if flag > 0 and value >= beta:
+                    return value
+                if flag < 0 and value <= alpha:
+                    return value
+
+        original_alpha = alpha
+        best_value = -math.inf
+        best = None
+        for cell in self.moves(me, opponent, first):
+            value = self.score_move(me, opponent, cell, depth, alpha, beta,
+                                    ply, deadline)
+            if value > best_value:
+                best_value, best = value, cell
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        if best is None:
+            # Only reachable when radius leaves no candidate cells
+            return self.evaluate(me, opponent)
+
+        if best_value <= original_alpha:
+            flag = -1
+        elif best_value >= beta:
+            flag = 1
+        else:
+            flag = 0
+        self.transposition_table[key] = (depth, flag,
+                                         _to_table(best_value, ply), best)
+        return best_value
+
+
+def root_split_speedup(game, board, depth, workers=None):
+    """
+    Times a serial and a root-split parallel search of the same board
+    to the same depth, each with an empty transposition table.
+    Returns a report including both moves and the speedup.
+    """
+    serial_game = Game(game.m, game.n, game.k, game.radius)
+    start = time.perf_counter()
+    serial_move = serial_game.fixed_depth_move(board, depth)
+    serial_seconds = time.perf_counter() - start
+
+    parallel_game = Game(game.m, game.n, game.k, game.radius)
+    start = time.perf_counter()
+    parallel_move = parallel_game.parallel_move(board, depth, workers)
+    parallel_seconds = time.perf_counter() - start
+
+    return {
+        "depth": depth,
+        "workers": workers or multiprocessing.cpu_count(),
+        "serial_move": serial_move,
+        "parallel_move": parallel_move,
+        "serial_seconds": serial_seconds,
+        "parallel_seconds": parallel_seconds,
+        "speedup": serial_seconds / parallel_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python mnk.py")
+    parser.add_argument("m", type=int)
+    parser.add_argument("n", type=int)
+    parser.add_argument("k", type=int)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--radius", type=int)
+    args = parser.parse_args()
+
+    game = Game(args.m, args.n, args.k, args.radius)
+    report = root_split_speedup(game, game.initial_state(), args.depth,
+                                args.workers)
+    print(f"Depth {report['depth']}, {report['workers']} workers")
+    print(f"Serial:   {report['serial_move']} in "
+          f"{report['serial_seconds']:.3f}s")
+    print(f"Parallel: {report['parallel_move']} in "
+          f"{report['parallel_seconds']:.3f}s")
+    print(f"Speedup:  {report['speedup']:.2f}x")
+
+
+def _init_worker(m, n, k, radius):
+    global _worker_game
+    _worker_game = Game(m, n, k, radius)
+
+
+def _score_root_move(me, opponent, cell, depth, alpha):
+    """
+    Score of one root move, searched in a worker process. Scores at
+    or below alpha are only upper bounds.
+    """
+    return _worker_game.score_move(me, opponent, cell, depth,
+                                   alpha, math.inf, 0, math.inf)
+
+
+def _first_best(moves, scores):
+    """
+    Returns the first move with the highest score.
+    """
+    best = max(scores)
+    return moves[scores.index(best)]
+
+
+def _to_table(value, ply):
+    """
+    Stores win scores relative to the position rather than the root.
+    """
+    if value >= WIN_THRESHOLD:
+        return value + ply
+    if value <= -WIN_THRESHOLD:
+        return value - ply
+    return value
+
+
+def _from_table(value, ply):
+    if value >= WIN_THRESHOLD:
+        return value - ply
+    if value <= -WIN_THRESHOLD:
+        return value + ply
+    return value
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Headless self-play for the Tic Tac Toe AI
+
+Plays games without pygame, AI against AI or against a random player,
+and reports results, moves per second, positions searched per move
+and move latency percentiles.
+
+Usage: python selfplay.py [--games N] [--opponent ai|random] [--workers N]
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import time
+
+import tictactoe as ttt
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python selfplay.py")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--opponent", choices=("ai", "random"),
+                        default="random")
+    parser.add_argument("--search", choices=("memo", "alphabeta"),
+                        default="memo")
+    parser.add_argument("--no-book", action="store_true",
+                        help="always search instead of using the opening book")
+    parser.add_argument("--cold", action="store_true",
+                        help="clear the transposition table before each move")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true",
+                        help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.games, args.opponent, args.search, not args.no_book,
+                 args.cold, args.workers, args.seed)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Games: {report['games']} ({report['workers']} workers, "
+          f"{report['seconds']:.2f}s)")
+    print(f"Results: X {report['results']['X']}, O {report['results']['O']}, "
+          f"draw {report['results']['draw']}, AI lost {report['ai_losses']}")
+    print(f"AI moves: {report['ai_moves']} "
+          f"({report['moves_per_second']:.0f} per second)")
+    print(f"Positions searched per move: {report['nodes_per_move']:.1f}")
+    latency = report["latency_ms"]
+    print(f"Latency (ms): p50 {latency['p50']:.3f}, p90 {latency['p90']:.3f}, "
+          f"p99 {latency['p99']:.3f}, max {latency['max']:.3f}")
+
+
+def run(games, opponent="random", search="memo", use_book=True, cold=False,
+        workers=1, seed=0):
+    """
+    Plays a number of games, in parallel when workers > 1, and
+    returns a report dictionary.
+    """
+    jobs = [(seed + game, opponent, search, use_book, cold)
+            for game in range(games)]
+    start = time.perf_counter()
+    if workers > 1:
+        with multiprocessing.Pool(workers) as pool:
+            played = pool.starmap(play_game, jobs)
+    else:
+        played = [play_game(*job) for job in jobs]
+    seconds = time.perf_counter() - start
+
+    latencies = sorted(latency for game in played
+                       for latency in game["latencies"])
+    nodes = sum(sum(game["nodes"]) for game in played)
+    results = {"X": 0, "O": 0, "draw": 0}
+    for game in played:
+        results[game["winner"] or "draw"] += 1
+
+    return {
+        "games": games,
+        "workers": workers,
+        "seconds": seconds,
+        "results": results,
+        "ai_losses": sum(1 for game in played if game["ai_lost"]),
+        "ai_moves": len(latencies),
+        "moves_per_second": (len(latencies) / sum(latencies)
+                             if latencies and sum(latencies) else 0.0),
+        "nodes_per_move": nodes / len(latencies) if latencies else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": 1000 * latencies[-1] if latencies else 0.0,
+        },
+    }
+
+
+def play_game(seed, opponent="random", search="memo", use_book=True,
+              cold=False):
+    """
+    Plays one game. Against a random opponent the AI plays X in even
+    seeds and O in odd ones. Returns the winner, whether an AI lost,
+    and the latency and positions searched for each AI move.
+    """
+    rng = random.Random(seed)
+    ai_players = {ttt.X, ttt.O}
+    if opponent == "random":
+        ai_players = {ttt.X if seed % 2 == 0 else ttt.O}
+
+    board = ttt.initial_state()
+    latencies = []
+    nodes = []
+    while not ttt.terminal(board):
+        turn = ttt.player(board)
+        if turn in ai_players:
+            if cold:
+                ttt.transposition_table.clear()
+            start = time.perf_counter()
+            action = ttt.minimax(board, search, use_book)
+            latencies.append(time.perf_counter() - start)
+            nodes.append(ttt.search_stats["nodes"])
+        else:
+            action = rng.choice(sorted(ttt.actions(board)))
+        board = ttt.result(board, action)
+
+    winner = ttt.winner(board)
+    return {
+        "winner": winner,
+        "ai_lost": winner is not None and winner not in ai_players,
+        "latencies": latencies,
+        "nodes": nodes,
+    }
+
+
+def percentile(values, p):
+    """
+    Returns the p-th percentile of sorted seconds, in milliseconds.
+    """
+    if not values:
+        return 0.0
+    i = min(len(values) - 1, round(p / 100 * (len(values) - 1)))
+    return 1000 * values[i]
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,30 @@ Tic Tac Toe Player
 """
 
 import math
-import copy
+import multiprocessing
+
+import bitboard
+import book
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Maps canonical position keys to their minimax value. Kept for the
+# life of the process, so it is reused across moves and games.
+transposition_table = {}
+
+# Number of positions visited by the most recent minimax call
+search_stats = {"nodes": 0}
+
+# Best move for each canonical position, read from book.BOOK_PATH on
+# first use; empty if no book has been generated
+opening_book = None
+
+# Move ordering for alpha-beta: centre, then corners, then edges
+CELL_ORDER = [4, 0, 2, 6, 8, 1, 3, 5, 7]
+
+
 def no_of_elements(board):
     
     count = 0
@@ -33,139 +51,251 @@ def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    if terminal(board):
+    x, o = bitboard.from_board(board)
+    if bitboard.terminal(x, o):
         return "Game Over!"
-    
-    count = no_of_elements(board)
 
-    if (count % 2) == 0:
-        return X
-    else:
-        return O    
+    return bitboard.player(x, o)
 
 
 def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
-    if terminal(board):
+    x, o = bitboard.from_board(board)
+    if bitboard.terminal(x, o):
         return "Game Over!"
-    
-    possible_moves = set()
-    
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] == EMPTY:
-                possible_moves.add((i, j))
-    
-    return possible_moves
+
+    return {bitboard.CELLS[k] for k in bitboard.moves(x, o)}
 
 
 def result(board, action):
     """
     Returns the board that results from making move (i, j) on the board.
     """
-    if action not in actions(board):
+    x, o = bitboard.from_board(board)
+    if (bitboard.terminal(x, o) or action not in bitboard.CELLS
+            or board[action[0]][action[1]] != EMPTY):
         raise NameError("Not a Valid Action!")
 
     row, col = action
-        
-    temp_board = copy.deepcopy(board)
-    
-    turn = player(board)
-    
-    temp_board[row][col] = turn
-   
+
+    temp_board = [list(cells) for cells in board]
+
+    temp_board[row][col] = bitboard.player(x, o)
+
     return temp_board
-    
+
 
 def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    
-    if board[0][0] == X and board[1][1] == X and board[2][2] == X:
-        return X
-    if board[0][0] == O and board[1][1] == O and board[2][2] == O:
-        return O
-    if board[0][2] == O and board[1][1] == O and board[2][0] == O:
-        return O
-    if board[0][2] == X and board[1][1] == X and board[2][0] == X:
-        return X
-    
-    for i in range(3):
-        if board[i][0] == X and board[i][1] == X and board[i][2] == X:
-            return X
-        if board[i][0] == O and board[i][1] == O and board[i][2] == O:
-            return O
-        if board[0][i] == X and board[1][i] == X and board[2][i] == X:
-            return X
-        if board[0][i] == O and board[1][i] == O and board[2][i] == O:
-            return O
-    
-    return None
+    return bitboard.winner(*bitboard.from_board(board))
+
 
 def terminal(board):
     """
     Returns True if game is over, False otherwise.
     """
-    if winner(board) == X or winner(board) == O:
-        return True
-    else:
-        return no_of_elements(board) == 9
+    return bitboard.terminal(*bitboard.from_board(board))
 
 
 def utility(board):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    if winner(board) == O:
-        return -1
-    elif winner(board) == X:
-        return 1
-    else:
-        return 0
+    return bitboard.utility(*bitboard.from_board(board))
+
+
+def canonical(board):
+    """
+    Returns the same key for all eight boards that are rotations
+    or reflections of each other.
+    """
+    return bitboard.canonical(*bitboard.from_board(board))
+
 
 def max_value(board):
-    
-    if terminal(board):
-        return utility(board)
-    
-    v = float('-inf')
-    
-    for action in actions(board):
-        v = max(v, min_value(result(board, action)))
-    
-    return v
+    """
+    Returns the minimax value of a board where X is to move.
+    """
+    return value(*bitboard.from_board(board))
+
 
 def min_value(board):
-    
-    if terminal(board):
-        return utility(board)
-    
-    v = float('inf')
-    
-    for action in actions(board):
-        v = min(v, max_value(result(board, action)))
-    
+    """
+    Returns the minimax value of a board where O is to move.
+    """
+    return value(*bitboard.from_board(board))
+
+
+def value(x, o):
+    """
+    Returns the minimax value of a position given as bitboards,
+    memoized in the transposition table.
+    """
+    search_stats["nodes"] += 1
+    key = bitboard.canonical(x, o)
+    if key in transposition_table:
+        return transposition_table[key]
+
+    if bitboard.terminal(x, o):
+        v = bitboard.utility(x, o)
+    elif bitboard.player(x, o) == X:
+        v = max(value(*bitboard.play(x, o, k)) for k in bitboard.moves(x, o))
+    else:
+        v = min(value(*bitboard.play(x, o, k)) for k in bitboard.moves(x, o))
+
+    transposition_table[key] = v
+    return v
+
+
+def ordered_moves(x, o):
+    """
+    Returns the empty cell indexes with winning moves first, then
+    the centre, corners and edges.
+    """
+    taken = x | o
+    mine = x if bitboard.player(x, o) == X else o
+    moves = [k for k in CELL_ORDER if not taken >> k & 1]
+    winning = [k for k in moves if bitboard.WINS[mine | 1 << k]]
+    return winning + [k for k in moves if k not in winning]
+
+
+def ordered_actions(board):
+    """
+    Returns the available actions with winning moves first, then
+    the centre, corners and edges.
+    """
+    return [bitboard.CELLS[k]
+            for k in ordered_moves(*bitboard.from_board(board))]
+
+
+def alphabeta(board, alpha=-math.inf, beta=math.inf):
+    """
+    Returns the minimax value of the board, skipping branches that
+    cannot change the result.
+    """
+    return search_alphabeta(*bitboard.from_board(board), alpha, beta)
+
+
+def search_alphabeta(x, o, alpha, beta):
+    """
+    Alpha-beta search over a position given as bitboards.
+    """
+    search_stats["nodes"] += 1
+    if bitboard.terminal(x, o):
+        return bitboard.utility(x, o)
+
+    if bitboard.player(x, o) == X:
+        v = -math.inf
+        for k in ordered_moves(x, o):
+            v = max(v, search_alphabeta(x | 1 << k, o, alpha, beta))
+            if v >= beta:
+                break
+            alpha = max(alpha, v)
+        return v
+
+    v = math.inf
+    for k in ordered_moves(x, o):
+        v = min(v, search_alphabeta(x, o | 1 << k, alpha, beta))
+        if v <= alpha:
+            break
+        beta = min(beta, v)
     return v
 
-def minimax(board):
+
+def book_move(x, o):
+    """
+    Returns the opening book's cell index for a position, or None if
+    the position is not in the book.
+    """
+    global opening_book
+    if opening_book is None:
+        opening_book = book.load()
+    key, symmetry = bitboard.canonical_symmetry(x, o)
+    cell = opening_book.get(key)
+    if cell is None:
+        return None
+    return bitboard.SYMMETRIES[symmetry][cell]
+
+
+def root_value(x, o, k, search):
+    """
+    Returns the exact value of playing cell k, searched on its own.
+    Used to evaluate root moves in worker processes.
+    """
+    child = bitboard.play(x, o, k)
+    if search == "alphabeta":
+        return search_alphabeta(*child, -math.inf, math.inf)
+    return value(*child)
+
+
+def minimax(board, search="memo", use_book=True, workers=1):
     """
     Returns the optimal action for the current player on the board.
+
+    Positions in the opening book are answered from it; otherwise
+    search is "memo" for the transposition table search or
+    "alphabeta" for alpha-beta pruning with move ordering. The
+    number of positions visited is left in search_stats["nodes"].
+
+    With workers > 1 each root move is searched in a separate process
+    and the same move as the serial search is chosen.
     """
-    if terminal(board):
+    search_stats["nodes"] = 0
+    x, o = bitboard.from_board(board)
+    if bitboard.terminal(x, o):
         return None
-    
-    if player(board) == X:
-        plays = []
-        for action in actions(board):
-            plays.append([min_value(result(board, action)), action])
-        return sorted(plays, reverse = True)[0][1]
-    
-    if player(board) == O:
-        plays = []
-        for action in actions(board):
-            plays.append([max_value(result(board, action)), action])
-        return sorted(plays)[0][1]
- 
\ No newline at end of file
+
+    if use_book:
+        k = book_move(x, o)
+        if k is not None:
+            return bitboard.CELLS[k]
+
+    if search not in ("memo", "alphabeta"):
+        raise ValueError(f"unknown search: {search}")
+
+    if workers > 1:
+        if search == "alphabeta":
+            moves = ordered_moves(x, o)
+        else:
+            moves = bitboard.moves(x, o)
+        with multiprocessing.Pool(workers) as pool:
+            values = pool.starmap(root_value,
+                                  [(x, o, k, search) for k in moves])
+        return bitboard.CELLS[pick_move(x, o, moves, values, search)]
+
+    if search == "alphabeta":
+        maximizing = bitboard.player(x, o) == X
+        best_move = None
+        alpha, beta = -math.inf, math.inf
+        for k in ordered_moves(x, o):
+            v = search_alphabeta(*bitboard.play(x, o, k), alpha, beta)
+            if maximizing and v > alpha:
+                alpha, best_move = v, k
+            elif not maximizing and v < beta:
+                beta, best_move = v, k
+        return bitboard.CELLS[best_move]
+
+    moves = bitboard.moves(x, o)
+    values = [value(*bitboard.play(x, o, k)) for k in moves]
+    return bitboard.CELLS[pick_move(x, o, moves, values, search)]
+
+
+def pick_move(x, o, moves, values, search):
+    """
+    Chooses among root moves given their exact values, breaking ties
+    the way each serial search does: alpha-beta keeps the first best
+    move in search order, the memoized search the largest (i, j) for
+    X and the smallest for O.
+    """
+    sign = 1 if bitboard.player(x, o) == X else -1
+    best = max(sign * v for v in values)
+    tied = [k for k, v in zip(moves, values) if sign * v == best]
+    if search == "alphabeta":
+        return tied[0]
+    if sign > 0:
+        return max(tied, key=lambda k: bitboard.CELLS[k])
+    return min(tied, key=lambda k: bitboard.CELLS[k])
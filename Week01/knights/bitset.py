@@ -0,0 +1,147 @@
+"""
+Bit-parallel model checking.
+
+A sentence is compiled once into a flat program over integer-indexed
+symbols. The program is then run on Python integers used as bitsets,
+where bit m of each value is the truth of that subformula in model m,
+so one pass evaluates a whole block of 2^BLOCK_BITS models at a time
+instead of walking the sentence tree once per model.
+"""
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Each block covers 2^BLOCK_BITS models
+BLOCK_BITS = 16
+
+# Program opcodes
+SYMBOL, NOT, AND, OR, IMPLIES, IFF = range(6)
+
+
+class Program():
+    """
+    Sentences compiled to a list of instructions. Each instruction
+    writes one register; identical subformulas share a register.
+    """
+
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.instructions = []
+        self.registers = {}
+
+    def add(self, sentence):
+        """
+        Compiles a sentence and returns the register holding its value.
+        """
+        if sentence in self.registers:
+            return self.registers[sentence]
+
+        if isinstance(sentence, Symbol):
+            instruction = (SYMBOL, self.index[sentence.name])
+        elif isinstance(sentence, Not):
+            instruction = (NOT, self.add(sentence.operand))
+        elif isinstance(sentence, And):
+            instruction = (AND, *[self.add(c) for c in sentence.conjuncts])
+        elif isinstance(sentence, Or):
+            instruction = (OR, *[self.add(d) for d in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            instruction = (IMPLIES, self.add(sentence.antecedent),
+                           self.add(sentence.consequent))
+        elif isinstance(sentence, Biconditional):
+            instruction = (IFF, self.add(sentence.left),
+                           self.add(sentence.right))
+        else:
+            raise TypeError(f"cannot compile {sentence!r}")
+
+        self.instructions.append(instruction)
+        register = len(self.instructions) - 1
+        self.registers[sentence] = register
+        return register
+
+    def run(self, columns, full):
+        """
+        Runs the program on one block. columns[i] is the bitset of
+        models where symbol i is true and full has a bit per model.
+        Returns the value of every register.
+        """
+        values = []
+        for op, *args in self.instructions:
+            if op == SYMBOL:
+                value = columns[args[0]]
+            elif op == NOT:
+                value = full ^ values[args[0]]
+            elif op == AND:
+                value = full
+                for arg in args:
+                    value &= values[arg]
+            elif op == OR:
+                value = 0
+                for arg in args:
+                    value |= values[arg]
+            elif op == IMPLIES:
+                value = (full ^ values[args[0]]) | values[args[1]]
+            else:
+                value = full ^ (values[args[0]] ^ values[args[1]])
+            values.append(value)
+        return values
+
+
+def blocks(count):
+    """
+    Yields (columns, full) for every block of models over count
+    symbols. Within a block the first BLOCK_BITS symbols vary from
+    bit to bit; the rest are fixed by the block number.
+    """
+    inner = min(count, BLOCK_BITS)
+    size = 1 << inner
+    full = (1 << size) - 1
+
+    # Symbol i < inner is true in models whose bit i is set: a pattern
+    # of 2^i zeros then 2^i ones, repeated across the block
+    patterns = []
+    for i in range(inner):
+        run = (1 << (1 << i)) - 1
+        pattern = run << (1 << i)
+        width = 2 << i
+        while width < size:
+            pattern |= pattern << width
+            width *= 2
+        patterns.append(pattern)
+
+    for block in range(1 << (count - inner)):
+        outer = [full if block >> i & 1 else 0 for i in range(count - inner)]
+        yield patterns + outer, full
+
+
+def model_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, evaluating blocks of
+    models at once.
+    """
+    return model_check_all(knowledge, [query])[0]
+
+
+def model_check_all(knowledge, queries):
+    """
+    Checks which queries the knowledge base entails, returning a list
+    of booleans. The models are enumerated once for all queries, and
+    enumeration stops early if none of them can still be entailed.
+    """
+    symbols = sorted(set.union(knowledge.symbols(),
+                               *[query.symbols() for query in queries]))
+    program = Program(symbols)
+    kb = program.add(knowledge)
+    registers = [program.add(query) for query in queries]
+
+    entailed = [True] * len(queries)
+    for columns, full in blocks(len(symbols)):
+        values = program.run(columns, full)
+        models = values[kb]
+        if not models:
+            continue
+        for i, register in enumerate(registers):
+            if entailed[i] and models & ~values[register]:
+                entailed[i] = False
+        if not any(entailed):
+            break
+    return entailed
@@ -0,0 +1,110 @@
+"""
+Conversion of logical sentences to conjunctive normal form.
+
+Clauses are lists of non-zero integers in the DIMACS convention: each
+symbol is a positive variable and a negative literal is its negation.
+Subformulas are named by auxiliary variables (Tseitin encoding), so the
+clauses grow linearly with the sentence instead of exponentially. Each
+auxiliary variable is defined to be equivalent to its subformula, so
+every model of the sentence extends to exactly one model of the
+clauses.
+"""
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+
+class CNF():
+    """Clauses equivalent to the sentences added so far."""
+
+    def __init__(self):
+        self.clauses = []
+
+        # Symbol name -> variable, and variable -> name or None when
+        # the variable is auxiliary
+        self.variables = {}
+        self.names = [None]
+
+        # Sentence -> literal equivalent to it
+        self.literals = {}
+
+    @property
+    def num_variables(self):
+        return len(self.names) - 1
+
+    def variable(self, name):
+        """Returns the variable of a symbol, creating it if needed."""
+        if name not in self.variables:
+            self.variables[name] = len(self.names)
+            self.names.append(name)
+        return self.variables[name]
+
+    def auxiliary(self):
+        """Returns a new variable not tied to any symbol."""
+        self.names.append(None)
+        return len(self.names) - 1
+
+    def add(self, sentence):
+        """Adds clauses asserting that sentence is true."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append([self.literal(d) for d in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            self.clauses.append([-self.literal(sentence.antecedent),
+                                 self.literal(sentence.consequent)])
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            self.clauses.extend([[-a, b], [a, -b]])
+        elif isinstance(sentence, Not) and isinstance(sentence.operand, And):
+            self.clauses.append([-self.literal(c)
+                                 for c in sentence.operand.conjuncts])
+        elif isinstance(sentence, Not) and isinstance(sentence.operand, Or):
+            for disjunct in sentence.operand.disjuncts:
+                self.add(Not(disjunct))
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """Returns a literal that is true exactly when sentence is."""
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.literals:
+            return self.literals[sentence]
+
+        if isinstance(sentence, And):
+            parts = [self.literal(c) for c in sentence.conjuncts]
+            v = self.auxiliary()
+            self.clauses.extend([-v, part] for part in parts)
+            self.clauses.append([v] + [-part for part in parts])
+        elif isinstance(sentence, Or):
+            parts = [self.literal(d) for d in sentence.disjuncts]
+            v = self.auxiliary()
+            self.clauses.extend([v, -part] for part in parts)
+            self.clauses.append([-v] + parts)
+        elif isinstance(sentence, Implication):
+            a = self.literal(sentence.antecedent)
+            b = self.literal(sentence.consequent)
+            v = self.auxiliary()
+            self.clauses.extend([[-v, -a, b], [v, a], [v, -b]])
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            v = self.auxiliary()
+            self.clauses.extend([[-v, -a, b], [-v, a, -b],
+                                 [v, a, b], [v, -a, -b]])
+        else:
+            raise TypeError(f"cannot convert {sentence!r}")
+
+        self.literals[sentence] = v
+        return v
+
+    def model(self, values):
+        """
+        Returns the symbol assignment of a solver model, where
+        values[v] is the truth of variable v.
+        """
+        return {name: bool(values[v]) for name, v in self.variables.items()}
@@ -0,0 +1,142 @@
+"""
+Model enumeration and counting for logical sentences.
+
+models() streams satisfying assignments from the SAT solver, blocking
+each one before asking for the next. count_models() is a #SAT counter
+over the Tseitin clauses of cnf.py: it propagates unit clauses, splits
+the remaining clauses into components that share no variables and
+multiplies their counts, and caches the count of every component it
+branches on. Since each auxiliary variable is equivalent to its
+subformula, the clauses have exactly as many models as the sentence.
+"""
+
+from cnf import CNF
+from sat import Solver
+
+
+def models(knowledge, symbols=()):
+    """
+    Yields each model of the knowledge base as a dict from symbol name
+    to truth value. Symbols not in the knowledge base can be added to
+    the models with symbols.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    for symbol in symbols:
+        cnf.variable(symbol.name)
+    variables = list(cnf.variables.values())
+
+    solver = Solver(cnf.clauses)
+    solver.reserve(cnf.num_variables)
+    while solver.solve():
+        model = solver.model
+        yield cnf.model(model)
+
+        # Rule this assignment of the symbols out of later solutions
+        if not solver.add_clause([-v if model[v] else v for v in variables]):
+            return
+
+
+def count_models(knowledge, symbols=()):
+    """
+    Returns the number of models of the knowledge base over its symbols
+    and any extra symbols given.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    for symbol in symbols:
+        cnf.variable(symbol.name)
+    clauses = [frozenset(clause) for clause in cnf.clauses]
+    clauses = [clause for clause in clauses
+               if not any(-literal in clause for literal in clause)]
+    return count(clauses, set(range(1, cnf.num_variables + 1)), {})
+
+
+def count(clauses, variables, cache):
+    """
+    Returns the number of assignments to variables that satisfy
+    clauses. cache maps components to their counts.
+    """
+    clauses, assigned = propagate(clauses)
+    if clauses is None:
+        return 0
+
+    total = 1
+    constrained = 0
+    for component in components(clauses):
+        component_variables = {abs(literal)
+                               for clause in component for literal in clause}
+        constrained += len(component_variables)
+        key = frozenset(component)
+        if key not in cache:
+            cache[key] = branch(component, component_variables, cache)
+        total *= cache[key]
+        if total == 0:
+            return 0
+
+    # Variables no clause mentions any more are free
+    return total << (len(variables) - assigned - constrained)
+
+
+def branch(clauses, variables, cache):
+    """Counts the models of one component by splitting on a variable."""
+    occurrences = {}
+    for clause in clauses:
+        for literal in clause:
+            occurrences[abs(literal)] = occurrences.get(abs(literal), 0) + 1
+    v = max(occurrences, key=occurrences.get)
+    rest = variables - {v}
+    return (count(condition(clauses, v), rest, cache)
+            + count(condition(clauses, -v), rest, cache))
+
+
+def condition(clauses, literal):
+    """Returns the clauses simplified by making literal true."""
+    return [clause - {-literal} for clause in clauses if literal not in clause]
+
+
+def propagate(clauses):
+    """
+    Makes every unit clause true until none remain. Returns the
+    simplified clauses and the number of variables assigned, or
+    (None, 0) if a clause becomes empty.
+    """
+    assigned = 0
+    while True:
+        units = set()
+        for clause in clauses:
+            if not clause:
+                return None, 0
+            if len(clause) == 1:
+                units |= clause
+        if not units:
+            return clauses, assigned
+        if any(-literal in units for literal in units):
+            return None, 0
+        falsified = {-literal for literal in units}
+        clauses = [clause - falsified for clause in clauses
+                   if clause.isdisjoint(units)]
+        assigned += len(units)
+
+
+def components(clauses):
+    """Splits clauses into groups that share no variables."""
+    parent = {}
+
+    def find(v):
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    for clause in clauses:
+        roots = [find(parent.setdefault(abs(literal), abs(literal)))
+                 for literal in clause]
+        for root in roots[1:]:
+            parent[find(root)] = find(roots[0])
+
+    groups = {}
+    for clause in clauses:
+        root = find(abs(next(iter(clause))))
+        groups.setdefault(root, []).append(clause)
+    return list(groups.values())
@@ -0,0 +1,95 @@
+"""
+Incremental knowledge base.
+
+Sentences are converted to clauses as they are added and loaded into
+one SAT solver that lives as long as the knowledge base, so clauses
+learned while answering one query speed up the next, and adding a
+sentence costs only its own clauses. Queries may also take temporary
+assumptions, which hold for that query only.
+"""
+
+import contextlib
+
+from cnf import CNF
+from logic import And, Not, Sentence
+from sat import Solver
+
+
+class KnowledgeBase():
+
+    def __init__(self, *sentences):
+        self.sentences = []
+        self.cnf = CNF()
+        self.solver = Solver()
+        self.loaded = 0
+
+        # Sentences assumed by every query inside assuming()
+        self.assumptions = []
+
+        for sentence in sentences:
+            self.add(sentence)
+
+    def __repr__(self):
+        return f"KnowledgeBase({', '.join(map(str, self.sentences))})"
+
+    def add(self, sentence):
+        """
+        Adds a sentence to the knowledge base. The sentence is converted
+        when added, so later changes to an And inside it are not seen.
+        """
+        Sentence.validate(sentence)
+        self.sentences.append(sentence)
+        self.cnf.add(sentence)
+        self.load()
+
+    def load(self):
+        """Passes clauses the solver has not seen yet to it."""
+        for clause in self.cnf.clauses[self.loaded:]:
+            self.solver.add_clause(clause)
+        self.loaded = len(self.cnf.clauses)
+        self.solver.reserve(self.cnf.num_variables)
+
+    def sentence(self):
+        """Returns the knowledge base as one sentence."""
+        return And(*self.sentences)
+
+    @contextlib.contextmanager
+    def assuming(self, *sentences):
+        """
+        Treats sentences as true for queries made inside the with
+        block, without adding them to the knowledge base.
+        """
+        for sentence in sentences:
+            Sentence.validate(sentence)
+        self.assumptions.extend(sentences)
+        try:
+            yield self
+        finally:
+            del self.assumptions[len(self.assumptions) - len(sentences):]
+
+    def solve(self, assumptions):
+        """
+        Solves under the current and given assumptions, returning
+        True if they are consistent with the knowledge base.
+        """
+        literals = [self.cnf.literal(sentence)
+                    for sentence in self.assumptions + list(assumptions)]
+        self.load()
+        return self.solver.solve(literals)
+
+    def satisfiable(self, *assumptions):
+        """Checks if the knowledge base and assumptions have a model."""
+        return self.solve(assumptions)
+
+    def entails(self, query, *assumptions):
+        """Checks if the knowledge base and assumptions entail query."""
+        return not self.solve(assumptions + (Not(query),))
+
+    def model(self, *assumptions):
+        """
+        Returns a model of the knowledge base and assumptions as a dict
+        from symbol name to truth value, or None if there is none.
+        """
+        if not self.solve(assumptions):
+            return None
+        return self.cnf.model(self.solver.model)
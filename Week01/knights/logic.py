@@ -1,19 +1,126 @@
 import itertools
+import weakref
 
 
 class Sentence():
+    """
+    Sentences other than And are interned: building one that is
+    structurally identical to a live sentence returns the existing node,
+    so shared subformulas are stored once. Operands are told apart by
+    identity, so a sentence built on an And always refers to that And.
+    Hashes and symbol sets are cached, and And.add bumps a generation
+    counter that marks every cache out of date, since any sentence may
+    contain the And.
+
+    Evaluation memoizes only the subformulas that occur more than once
+    within the sentence being evaluated.
+    """
+
+    __slots__ = ("_hash", "_symbols", "_generation", "_shared",
+                 "__weakref__")
+
+    # Live interned sentences, keyed by class and operands
+    interned = weakref.WeakValueDictionary()
+
+    # Incremented whenever an And gains a conjunct
+    generation = 0
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
+        return self.value(model, dict.fromkeys(self.shared()))
+
+    def value(self, model, memo):
+        """
+        Evaluates the sentence, reusing values of shared subformulas.
+        memo has a key for each shared subformula, None until evaluated.
+        """
         raise Exception("nothing to evaluate")
 
+    def recall(self, model, memo):
+        """Returns the value of a shared subformula, evaluating it once."""
+        key = id(self)
+        value = memo.pop(key)
+        if value is None:
+            value = self.value(model, memo)
+        memo[key] = value
+        return value
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self.symbol_set())
+
+    def operands(self):
+        """Returns the immediate subformulas of the sentence."""
+        return ()
+
+    def symbol_set(self):
+        """Returns the cached frozenset of symbols in the sentence."""
+        self.refresh()
+        return self._symbols
+
+    def __hash__(self):
+        self.refresh()
+        return self._hash
+
+    def __reduce__(self):
+        # Rebuild through the constructor so that copies and unpickled
+        # sentences are interned, and no cached state from another
+        # process is carried over
+        return type(self), tuple(self.operands())
+
+    def shared(self):
+        """
+        Returns the ids of the subformulas reached more than once in the
+        sentence. Symbols and negations are cheaper to evaluate again than
+        to look up, so they are left out. The result is cached.
+        """
+        generation, shared = getattr(self, "_shared", (None, None))
+        if generation != Sentence.generation:
+            seen = set()
+            shared = set()
+            stack = [self]
+            while stack:
+                sentence = stack.pop()
+                if isinstance(sentence, Symbol):
+                    continue
+                if isinstance(sentence, Not):
+                    stack.append(sentence.operand)
+                    continue
+                if id(sentence) in seen:
+                    shared.add(id(sentence))
+                    continue
+                seen.add(id(sentence))
+                stack.extend(sentence.operands())
+            shared = frozenset(shared)
+            self._shared = (Sentence.generation, shared)
+        return shared
+
+    def refresh(self):
+        """Recomputes the cached hash and symbols if out of date."""
+        if self._generation != Sentence.generation:
+            operands = self.operands()
+            self._hash = hash((type(self).__name__,
+                               tuple(hash(operand) for operand in operands)))
+            self._symbols = frozenset().union(
+                *[operand.symbol_set() for operand in operands]
+            )
+            self._generation = Sentence.generation
+
+    @classmethod
+    def node(cls, key, **fields):
+        """Returns the interned sentence for key, creating it if needed."""
+        sentence = Sentence.interned.get((cls, key))
+        if sentence is None:
+            sentence = object.__new__(cls)
+            for name, value in fields.items():
+                setattr(sentence, name, value)
+            sentence._generation = None
+            Sentence.interned[(cls, key)] = sentence
+        return sentence
 
     @classmethod
     def validate(cls, sentence):
@@ -44,19 +151,32 @@ class Sentence():
 
 class Symbol(Sentence):
 
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ("name",)
+
+    def __new__(cls, name):
+        symbol = cls.node(name, name=name)
+        if symbol._generation is None:
+            symbol._hash = hash(("symbol", name))
+            symbol._symbols = frozenset([name])
+            symbol._generation = Sentence.generation
+        return symbol
 
     def __eq__(self, other):
         return isinstance(other, Symbol) and self.name == other.name
 
     def __hash__(self):
-        return hash(("symbol", self.name))
+        return self._hash
+
+    def __reduce__(self):
+        return Symbol, (self.name,)
 
     def __repr__(self):
         return self.name
 
-    def evaluate(self, model):
+    def refresh(self):
+        pass
+
+    def value(self, model, memo):
         try:
             return bool(model[self.name])
         except KeyError:
@@ -65,47 +185,56 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
-
 
 class Not(Sentence):
-    def __init__(self, operand):
+
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
         Sentence.validate(operand)
-        self.operand = operand
+        return cls.node(id(operand), operand=operand)
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or (isinstance(other, Not)
+                                 and self.operand == other.operand)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         return f"Not({self.operand})"
 
-    def evaluate(self, model):
-        return not self.operand.evaluate(model)
+    def operands(self):
+        return (self.operand,)
+
+    def value(self, model, memo):
+        return not self.operand.value(model, memo)
 
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
-
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    """
+    And is the one sentence that can change, through add, so it is
+    never interned: two And sentences are always separate nodes, and
+    sentences built on them are too.
+    """
+
+    __slots__ = ("conjuncts",)
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
+        sentence = object.__new__(cls)
+        sentence.conjuncts = list(conjuncts)
+        sentence._generation = None
+        return sentence
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return self is other or (isinstance(other, And)
+                                 and self.conjuncts == other.conjuncts)
 
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -116,9 +245,15 @@ class And(Sentence):
     def add(self, conjunct):
         Sentence.validate(conjunct)
         self.conjuncts.append(conjunct)
+        Sentence.generation += 1
 
-    def evaluate(self, model):
-        return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
+    def operands(self):
+        return self.conjuncts
+
+    def value(self, model, memo):
+        if memo and id(self) in memo:
+            return self.recall(model, memo)
+        return all(conjunct.value(model, memo) for conjunct in self.conjuncts)
 
     def formula(self):
         if len(self.conjuncts) == 1:
@@ -126,30 +261,33 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
-
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        return cls.node(tuple(map(id, disjuncts)), disjuncts=disjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return self is other or (isinstance(other, Or)
+                                 and self.disjuncts == other.disjuncts)
 
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
 
-    def evaluate(self, model):
-        return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
+    def operands(self):
+        return self.disjuncts
+
+    def value(self, model, memo):
+        if memo and id(self) in memo:
+            return self.recall(model, memo)
+        return any(disjunct.value(model, memo) for disjunct in self.disjuncts)
 
     def formula(self):
         if len(self.disjuncts) == 1:
@@ -157,73 +295,74 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
-
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+        return cls.node((id(antecedent), id(consequent)),
+                        antecedent=antecedent, consequent=consequent)
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (isinstance(other, Implication)
+                                 and self.antecedent == other.antecedent
+                                 and self.consequent == other.consequent)
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
 
-    def evaluate(self, model):
-        return ((not self.antecedent.evaluate(model))
-                or self.consequent.evaluate(model))
+    def operands(self):
+        return (self.antecedent, self.consequent)
+
+    def value(self, model, memo):
+        if memo and id(self) in memo:
+            return self.recall(model, memo)
+        return ((not self.antecedent.value(model, memo))
+                or self.consequent.value(model, memo))
 
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
-
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
+        return cls.node((id(left), id(right)), left=left, right=right)
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (isinstance(other, Biconditional)
+                                 and self.left == other.left
+                                 and self.right == other.right)
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
-    def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+    def operands(self):
+        return (self.left, self.right)
+
+    def value(self, model, memo):
+        if memo and id(self) in memo:
+            return self.recall(model, memo)
+        return self.left.value(model, memo) == self.right.value(model, memo)
 
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
 
 def model_check(knowledge, query):
     """Checks if knowledge base entails query."""
@@ -0,0 +1,227 @@
+"""
+Proof-based entailment for logical sentences.
+
+Sentences are converted to clauses by cnf.py, which names compound
+subformulas with auxiliary variables so that the clauses grow linearly
+with the sentence, and stored in a ClauseStore that indexes clauses by
+literal. Two engines share the store:
+
+- resolution refutes knowledge and not query, resolving against the
+  set of support (the negated query and its descendants) before the
+  knowledge base among itself, and discarding subsumed clauses, and
+- forward_chaining proves atomic queries from Horn clauses in time
+  linear in the size of the knowledge base.
+
+Their cost depends on the proof found rather than on the 2^n models.
+"""
+
+import heapq
+import itertools
+
+from cnf import CNF
+
+
+class ClauseStore():
+    """
+    Clauses as frozensets of integer literals, converted by a CNF so that
+    each compound subformula is named by an auxiliary variable, with an
+    index from literal to the clauses containing it.
+    """
+
+    def __init__(self):
+        self.cnf = CNF()
+        self.clauses = {}
+        self.index = {}
+        self.ids = itertools.count()
+
+    def convert(self, sentence):
+        """
+        Returns the clauses asserting sentence, with the definitions of
+        any auxiliary variables it needs.
+        """
+        start = len(self.cnf.clauses)
+        self.cnf.add(sentence)
+        return [frozenset(clause) for clause in self.cnf.clauses[start:]]
+
+    def negate(self, sentence):
+        """
+        Returns the clauses asserting the negation of sentence: a unit
+        clause, followed by the definitions of any auxiliary variables.
+        """
+        start = len(self.cnf.clauses)
+        literal = self.cnf.literal(sentence)
+        definitions = [frozenset(clause)
+                       for clause in self.cnf.clauses[start:]]
+        return [frozenset([-literal])] + definitions
+
+    def add(self, clause):
+        """
+        Adds a clause unless a stored clause subsumes it, removing the
+        stored clauses it subsumes. Returns the new clause's id, or
+        None if it was not added.
+        """
+        if self.subsumed(clause):
+            return None
+        for other in self.subsuming(clause):
+            self.remove(other)
+        clause_id = next(self.ids)
+        self.clauses[clause_id] = clause
+        for literal in clause:
+            self.index.setdefault(literal, set()).add(clause_id)
+        return clause_id
+
+    def remove(self, clause_id):
+        for literal in self.clauses.pop(clause_id):
+            self.index[literal].discard(clause_id)
+
+    def containing(self, literal):
+        """Returns the ids of the clauses containing a literal."""
+        return self.index.get(literal, ())
+
+    def subsumed(self, clause):
+        """Checks if a stored clause is a subset of clause."""
+        counts = {}
+        for literal in clause:
+            for other in self.containing(literal):
+                counts[other] = counts.get(other, 0) + 1
+                if counts[other] == len(self.clauses[other]):
+                    return True
+        return False
+
+    def subsuming(self, clause):
+        """Returns the ids of the stored clauses that contain clause."""
+        if not clause:
+            return list(self.clauses)
+        occurrences = sorted((self.containing(literal) for literal in clause),
+                             key=len)
+        return list(set(occurrences[0]).intersection(*occurrences[1:]))
+
+
+def tautology(clause):
+    return any(-literal in clause for literal in clause)
+
+
+def resolution(knowledge, query):
+    """
+    Checks if knowledge base entails query by deriving the empty clause
+    from knowledge and not query. Resolution is first restricted to the
+    set of support, which is complete when the knowledge base itself is
+    consistent. If that saturates, the remaining knowledge base clauses
+    are resolved among themselves, since an inconsistent knowledge base
+    entails every query.
+    """
+    store = ClauseStore()
+    for clause in store.convert(knowledge):
+        if not clause:
+            return True
+        if not tautology(clause):
+            store.add(clause)
+
+    # Clauses waiting to be resolved, shortest first. Only the negated
+    # query is support: the definitions of its auxiliary variables are
+    # consistent with the knowledge base, like the knowledge base itself
+    negation, *definitions = store.negate(query)
+    for clause in definitions:
+        if not tautology(clause):
+            store.add(clause)
+    support = []
+    clause_id = store.add(negation)
+    if clause_id is not None:
+        heapq.heappush(support, (len(negation), clause_id))
+    usable = set(store.clauses).difference(i for _, i in support)
+
+    # Clauses already resolved against everything usable before them
+    given = set()
+    if saturate(store, support, usable, given):
+        return True
+
+    # Every clause not yet given becomes support, and is resolved only
+    # against the given clauses, so each pair is resolved once
+    support = [(len(clause), clause_id)
+               for clause_id, clause in store.clauses.items()
+               if clause_id not in given]
+    heapq.heapify(support)
+    return saturate(store, support, set(given), given)
+
+
+def saturate(store, support, usable, given):
+    """
+    Resolves support clauses, shortest first, against usable clauses
+    until the empty clause is derived or no support is left. Each
+    support clause becomes usable once resolved, and resolvents become
+    support. Returns True if the empty clause was derived.
+    """
+    while support:
+        _, clause_id = heapq.heappop(support)
+        if clause_id not in store.clauses or clause_id in given:
+            continue
+        clause = store.clauses[clause_id]
+        usable.add(clause_id)
+        given.add(clause_id)
+
+        for literal in clause:
+            for other_id in list(store.containing(-literal)):
+                if other_id not in usable or other_id not in store.clauses:
+                    continue
+                other = store.clauses[other_id]
+                resolvent = (clause - {literal}) | (other - {-literal})
+                if not resolvent:
+                    return True
+                if tautology(resolvent):
+                    continue
+                new_id = store.add(resolvent)
+                if new_id is not None:
+                    heapq.heappush(support, (len(resolvent), new_id))
+
+            # The given clause may have been subsumed by a resolvent
+            if clause_id not in store.clauses:
+                break
+    return False
+
+
+def forward_chaining(knowledge, query):
+    """
+    Checks if a Horn knowledge base entails query, a symbol or a
+    conjunction of symbols. The knowledge base is Horn if its clauses,
+    auxiliary variables included, are: facts, implications whose
+    antecedent is a conjunction of symbols, negated conjunctions and
+    the like. Each clause is visited once per premise.
+    """
+    store = ClauseStore()
+    for clause in store.convert(knowledge):
+        if not clause:
+            return True
+        if tautology(clause):
+            continue
+        if sum(literal > 0 for literal in clause) > 1:
+            raise ValueError("knowledge base is not a set of Horn clauses")
+        store.add(clause)
+
+    goals = []
+    for clause in store.convert(query):
+        if (len(clause) != 1 or min(clause) < 0
+                or store.cnf.names[min(clause)] is None):
+            raise ValueError("query must be a symbol or a conjunction of them")
+        goals.append(next(iter(clause)))
+
+    # Premises of each clause not yet known to be true
+    remaining = {clause_id: sum(literal < 0 for literal in clause)
+                 for clause_id, clause in store.clauses.items()}
+    agenda = [max(clause) for clause_id, clause in store.clauses.items()
+              if remaining[clause_id] == 0]
+    inferred = set()
+    while agenda:
+        literal = agenda.pop()
+        if literal in inferred:
+            continue
+        inferred.add(literal)
+        for clause_id in store.containing(-literal):
+            remaining[clause_id] -= 1
+            if remaining[clause_id] == 0:
+                head = [l for l in store.clauses[clause_id] if l > 0]
+                if not head:
+                    # A goal clause fired: the knowledge base is
+                    # inconsistent and entails everything
+                    return True
+                agenda.append(head[0])
+    return all(goal in inferred for goal in goals)
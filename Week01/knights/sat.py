@@ -0,0 +1,338 @@
+"""
+Conflict-driven clause learning SAT solver.
+
+Clauses use the integer literals of cnf.py. Unit propagation uses two
+watched literals per clause, conflicts are analysed to the first unique
+implication point and the learned clause is kept, decisions follow
+variable activity with saved phases, and the search restarts on a Luby
+schedule. Clauses can be added between calls to solve, and solve takes
+assumptions that hold for that call only, so one solver can answer
+many related questions.
+"""
+
+import heapq
+
+from cnf import CNF
+from logic import Not
+
+# Conflicts per unit of the Luby restart schedule
+RESTART_BASE = 100
+
+ACTIVITY_DECAY = 0.95
+
+
+class Solver():
+
+    def __init__(self, clauses=()):
+        self.num_variables = 0
+        self.clauses = []
+        self.learned = []
+
+        # Literal -> clauses watching it
+        self.watches = {}
+
+        # Indexed by variable: value (None when unassigned), decision
+        # level, the clause that implied it, saved phase and activity
+        self.values = [None]
+        self.levels = [0]
+        self.reasons = [None]
+        self.phases = [False]
+        self.activity = [0.0]
+        self.increment = 1.0
+        self.order = []
+
+        # Assigned literals in order, the start of each decision level
+        # in trail, and the next trail position to propagate
+        self.trail = []
+        self.limits = []
+        self.head = 0
+
+        # False once the clauses are unsatisfiable without assumptions
+        self.ok = True
+        self.model = None
+        self.stats = {"decisions": 0, "propagations": 0, "conflicts": 0,
+                      "restarts": 0}
+
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def reserve(self, count):
+        """Makes variables 1 to count available."""
+        while self.num_variables < count:
+            self.num_variables += 1
+            self.values.append(None)
+            self.levels.append(0)
+            self.reasons.append(None)
+            self.phases.append(False)
+            self.activity.append(0.0)
+            self.watches[self.num_variables] = []
+            self.watches[-self.num_variables] = []
+            heapq.heappush(self.order, (0.0, self.num_variables))
+
+    def value(self, literal):
+        """Returns the truth of a literal, or None if unassigned."""
+        value = self.values[abs(literal)]
+        if value is None or literal > 0:
+            return value
+        return not value
+
+    def add_clause(self, literals):
+        """
+        Adds a clause. Returns False if the clauses have become
+        unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self.backtrack(0)
+        self.reserve(max((abs(literal) for literal in literals), default=0))
+
+        clause = []
+        for literal in literals:
+            value = self.value(literal)
+            if value or -literal in clause:
+                # Satisfied at the top level, or a tautology
+                return True
+            if value is None and literal not in clause:
+                clause.append(literal)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(clause)
+            self.clauses.append(clause)
+        return self.ok
+
+    def attach(self, clause):
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def assign(self, literal, reason):
+        v = abs(literal)
+        self.values[v] = literal > 0
+        self.levels[v] = len(self.limits)
+        self.reasons[v] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal implied by unit clauses. Returns a
+        clause with all literals false, or None.
+        """
+        values = self.values
+        while self.head < len(self.trail):
+            literal = self.trail[self.head]
+            self.head += 1
+            self.stats["propagations"] += 1
+
+            # Clauses watching the literal that just became false
+            false = -literal
+            watching = self.watches[false]
+            kept = []
+            i = 0
+            while i < len(watching):
+                clause = watching[i]
+                i += 1
+
+                # Keep the false literal in position 1
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                value = values[abs(first)]
+                if value is not None and value == (first > 0):
+                    kept.append(clause)
+                    continue
+
+                # Look for another literal that is not false to watch
+                for k in range(2, len(clause)):
+                    other = clause[k]
+                    value = values[abs(other)]
+                    if value is None or value == (other > 0):
+                        clause[1], clause[k] = other, false
+                        self.watches[other].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if values[abs(first)] is None:
+                        self.assign(first, clause)
+                    else:
+                        # Conflict: keep the remaining watches and stop
+                        kept.extend(watching[i:])
+                        self.watches[false] = kept
+                        return clause
+            self.watches[false] = kept
+        return None
+
+    def analyse(self, conflict):
+        """
+        Returns the clause learned from a conflict, its asserting
+        literal first, and the level to backtrack to.
+        """
+        level = len(self.limits)
+        learned = [None]
+        seen = set()
+        pending = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = conflict
+
+        while True:
+            for other in (clause if literal is None else clause[1:]):
+                v = abs(other)
+                if v not in seen and self.levels[v] > 0:
+                    seen.add(v)
+                    self.bump(v)
+                    if self.levels[v] == level:
+                        pending += 1
+                    else:
+                        learned.append(other)
+
+            # Walk back to the next literal of this level in the conflict
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            seen.discard(abs(literal))
+            clause = self.reasons[abs(literal)]
+            pending -= 1
+            if pending == 0:
+                break
+
+        learned[0] = -literal
+        if len(learned) == 1:
+            return learned, 0
+
+        # Watch the literal of the highest remaining level second
+        i = max(range(1, len(learned)),
+                key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[i] = learned[i], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def bump(self, v):
+        self.activity[v] += self.increment
+        if self.activity[v] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+            self.order = [(-self.activity[u], u)
+                          for u in range(1, self.num_variables + 1)
+                          if self.values[u] is None]
+            heapq.heapify(self.order)
+        elif self.values[v] is None:
+            heapq.heappush(self.order, (-self.activity[v], v))
+
+    def backtrack(self, level):
+        """Undoes every assignment above a decision level."""
+        if len(self.limits) <= level:
+            return
+        for literal in reversed(self.trail[self.limits[level]:]):
+            v = abs(literal)
+            self.values[v] = None
+            self.reasons[v] = None
+            self.phases[v] = literal > 0
+            heapq.heappush(self.order, (-self.activity[v], v))
+        del self.trail[self.limits[level]:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """Returns the unassigned variable with the highest activity."""
+        while self.order:
+            activity, v = heapq.heappop(self.order)
+            if self.values[v] is None and -activity == self.activity[v]:
+                return v
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses and assumptions are satisfiable,
+        storing a model in self.model where self.model[v] is the value
+        of variable v. Assumptions are literals that hold for this
+        call only.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        self.backtrack(0)
+        self.reserve(max((abs(a) for a in assumptions), default=0))
+        if self.propagate() is not None:
+            self.ok = False
+            return False
+
+        restarts = 0
+        budget = RESTART_BASE * luby(restarts)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.stats["conflicts"] += 1
+                if not self.limits:
+                    self.ok = False
+                    return False
+                learned, level = self.analyse(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.attach(learned)
+                    self.learned.append(learned)
+                    self.assign(learned[0], learned)
+                self.increment /= ACTIVITY_DECAY
+                budget -= 1
+                continue
+
+            if budget <= 0:
+                restarts += 1
+                self.stats["restarts"] += 1
+                budget = RESTART_BASE * luby(restarts)
+                self.backtrack(0)
+                continue
+
+            # Assumptions take the first decision levels
+            literal = None
+            while len(self.limits) < len(assumptions):
+                assumption = assumptions[len(self.limits)]
+                value = self.value(assumption)
+                if value is False:
+                    self.backtrack(0)
+                    return False
+                self.limits.append(len(self.trail))
+                if value is None:
+                    literal = assumption
+                    break
+
+            if literal is None:
+                v = self.decide()
+                if v is None:
+                    self.model = list(self.values)
+                    self.backtrack(0)
+                    return True
+                literal = v if self.phases[v] else -v
+                self.stats["decisions"] += 1
+                self.limits.append(len(self.trail))
+            self.assign(literal, None)
+
+
+def luby(i):
+    """Returns term i of the Luby sequence 1, 1, 2, 1, 1, 2, 4, ..."""
+    size, exponent = 1, 0
+    while size < i + 1:
+        exponent += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) // 2
+        exponent -= 1
+        i %= size
+    return 2 ** exponent
+
+
+def entails(knowledge, query):
+    """
+    Checks if knowledge base entails query by showing that knowledge
+    and not query has no model.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.add(Not(query))
+    solver = Solver(cnf.clauses)
+    return not solver.solve()
@@ -98,6 +98,11 @@ class Sentence():
     def __eq__(self, other):
         return self.cells == other.cells and self.count == other.count
 
+    def __hash__(self):
+        # Sentences change when cells are marked, so a sentence must be
+        # taken out of any set before it is marked and put back after
+        return hash((frozenset(self.cells), self.count))
+
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
@@ -153,8 +158,16 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Safe cells that have not been clicked on yet
+        self.safe_moves = set()
+
+        # Set of sentences about the game known to be true, and the
+        # sentences each cell appears in
+        self.knowledge = set()
+        self.containing = {}
+
+        # Sentences added or changed since inference last looked at them
+        self.worklist = []
 
     def mark_mine(self, cell):
         """
@@ -162,8 +175,10 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
+        for sentence in list(self.containing.get(cell, ())):
+            self.remove_sentence(sentence)
             sentence.mark_mine(cell)
+            self.add_sentence(sentence)
 
     def mark_safe(self, cell):
         """
@@ -171,8 +186,34 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
+        if cell not in self.moves_made:
+            self.safe_moves.add(cell)
+        for sentence in list(self.containing.get(cell, ())):
+            self.remove_sentence(sentence)
             sentence.mark_safe(cell)
+            self.add_sentence(sentence)
+
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base and queues it for
+        inference, unless it is empty or already known.
+        """
+        if not sentence.cells or sentence in self.knowledge:
+            return
+        self.knowledge.add(sentence)
+        for cell in sentence.cells:
+            self.containing.setdefault(cell, set()).add(sentence)
+        self.worklist.append(sentence)
+
+    def remove_sentence(self, sentence):
+        """
+        Removes a sentence from the knowledge base.
+        """
+        self.knowledge.discard(sentence)
+        for cell in sentence.cells:
+            self.containing[cell].discard(sentence)
+            if not self.containing[cell]:
+                del self.containing[cell]
 
     def add_knowledge(self, cell, count):
         """
@@ -191,6 +232,7 @@ class MinesweeperAI():
         """
         # Step 1 and 2: Mark the cell as a move made and as safe
         self.moves_made.add(cell)
+        self.safe_moves.discard(cell)
         self.mark_safe(cell)
 
         # Step 3: Create a new sentence based on the cell's neighbors
@@ -209,9 +251,8 @@ class MinesweeperAI():
         count -= len(neighbors) - len(unknown_neighbors)
         
         if unknown_neighbors:
-            new_sentence = Sentence(unknown_neighbors, count)
-            self.knowledge.append(new_sentence)
-        
+            self.add_sentence(Sentence(unknown_neighbors, count))
+
         # Update the knowledge base with the new information
         self.update_knowledge()
 
@@ -220,45 +261,44 @@ class MinesweeperAI():
         """
         Updates the knowledge base by marking new cells as safe or as mines,
         and inferring new sentences from the existing knowledge base.
+
+        Only sentences on the worklist are examined, and only against the
+        sentences they share a cell with. When one sentence's cells are a
+        subset of another's, the larger sentence is replaced by the
+        difference, so the knowledge base never grows from inference.
         """
-        updated = True
-        while updated:
-            updated = False
-
-            safes = set()
-            mines = set()
-
-            for sentence in self.knowledge:
-                safes.update(sentence.known_safes())
-                mines.update(sentence.known_mines())
-
-            if safes:
-                updated = True
-                for safe in safes:
-                    self.mark_safe(safe)
-
-            if mines:
-                updated = True
-                for mine in mines:
-                    self.mark_mine(mine)
-
-            # Remove empty sentences
-            self.knowledge = [sentence for sentence in self.knowledge if sentence.cells]
-
-            # Try to infer new knowledge
-            new_knowledge = []
-            for sentence1 in self.knowledge:
-                for sentence2 in self.knowledge:
-                    if sentence1 != sentence2 and sentence1.cells.issubset(sentence2.cells):
-                        new_cells = sentence2.cells - sentence1.cells
-                        new_count = sentence2.count - sentence1.count
-                        new_sentence = Sentence(new_cells, new_count)
-                        if new_sentence not in self.knowledge and new_sentence not in new_knowledge:
-                            new_knowledge.append(new_sentence)
-
-            if new_knowledge:
-                updated = True
-                self.knowledge.extend(new_knowledge)
+        while self.worklist:
+            sentence = self.worklist.pop()
+            if sentence not in self.knowledge:
+                continue
+
+            # Mark the cells the sentence settles, which changes every
+            # sentence containing them and queues those again
+            mines = set(sentence.known_mines())
+            safes = set(sentence.known_safes())
+            for mine in mines:
+                self.mark_mine(mine)
+            for safe in safes:
+                self.mark_safe(safe)
+            if mines or safes:
+                continue
+
+            # Try to infer new knowledge from sentences sharing a cell
+            others = set()
+            for cell in sentence.cells:
+                others.update(self.containing[cell])
+            for other in others:
+                if other.cells < sentence.cells:
+                    subset, superset = other, sentence
+                elif sentence.cells < other.cells:
+                    subset, superset = sentence, other
+                else:
+                    continue
+                self.remove_sentence(superset)
+                self.add_sentence(Sentence(superset.cells - subset.cells,
+                                           superset.count - subset.count))
+                if superset is sentence:
+                    break
 
     def make_safe_move(self):
         """
@@ -269,9 +309,8 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        for cell in self.safes:
-            if cell not in self.moves_made:
-                return cell
+        for cell in self.safe_moves:
+            return cell
         return None
 
     def make_random_move(self):